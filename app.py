@@ -1,12 +1,44 @@
-from fastapi import FastAPI, Body, HTTPException, Query, UploadFile, File, Form
+import time
+
+# Startup report: everything is measured from the first line of app.py
+_STARTED = time.perf_counter()
+
+from fastapi import FastAPI, Body, HTTPException, Query, Request, UploadFile, File, Form
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
-from pathlib import Path
+from starlette.datastructures import Headers
+from starlette.staticfiles import NotModifiedResponse
+from starlette.middleware.gzip import GZipResponder
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from email.utils import formatdate
+from pathlib import Path, PurePosixPath
+import asyncio
+import bisect
+import functools
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import posixpath
+import queue
+import re
 import threading
 import shutil
+import tarfile
+import uuid
+import zipfile
+
+try:
+    import brotli
+except ImportError:  # optional: only gzip siblings are generated without it
+    brotli = None
 
-from matrix import matrix_burst
+# matrix.py (ASCII art, console setup) is only imported once an effect or
+# the rain stream is first used, keeping it off the cold-start path.
 
 # =========================
 # PATH SETUP (SINGLE SOURCE OF TRUTH)
@@ -15,12 +47,133 @@ from matrix import matrix_burst
 BASE_DIR = Path(__file__).resolve().parent
 HACK_DIR = BASE_DIR / "hack"
 WEB_DIR  = BASE_DIR / "web"
+CACHE_DIR = BASE_DIR / ".cache"
+TEMPLATES_DIR = BASE_DIR / "templates"
 
 # Ensure folders exist
 HACK_DIR.mkdir(exist_ok=True)
 WEB_DIR.mkdir(exist_ok=True)
+CACHE_DIR.mkdir(exist_ok=True)
+
+STARTUP_REPORT: dict[str, float] = {}
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Nothing slow here: the first index scan and the staging cleanup run in
+    # the background so the server can answer /healthz straight away.
+    lifespan_started = time.perf_counter()
+    submit_job("cleanup", cleanup_stale_uploads)
+    submit_job("cleanup", cleanup_old_jobs)
+    submit_job("cleanup", cleanup_upload_sessions)
+    start_project_index()
+    STARTUP_REPORT["lifespan_ms"] = round((time.perf_counter() - lifespan_started) * 1000, 1)
+    STARTUP_REPORT["ready_ms"] = round((time.perf_counter() - _STARTED) * 1000, 1)
+    yield
+    stop_project_index()
+
+
+app = FastAPI(lifespan=lifespan)
+
+# =========================
+# BACKGROUND I/O + JOBS
+# =========================
+# Disk work runs on a dedicated, sized thread pool instead of Starlette's
+# shared one, so a slow disk can't starve request handling. Long-running
+# work (deleting big trees...) goes to a separate job pool and is tracked
+# by id so the client can poll it. Jobs whose id is handed to a client are
+# also recorded in CACHE_DIR/jobs, since with several workers the poll may
+# land on a different process.
+
+IO_WORKERS = int(os.environ.get("MATRIX_IO_WORKERS", min(32, (os.cpu_count() or 1) + 4)))
+JOB_WORKERS = int(os.environ.get("MATRIX_JOB_WORKERS", 2))
+JOB_HISTORY = 200
+JOBS_DIR = CACHE_DIR / "jobs"
+
+io_executor = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="matrix-io")
+job_executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="matrix-job")
+
+_jobs: dict[str, dict] = {}
+_jobs_lock = threading.Lock()
+
+
+async def run_io(fn, *args, **kwargs):
+    """Run a blocking filesystem call on the I/O pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(io_executor, functools.partial(fn, *args, **kwargs))
+
+
+def _save_job(job: dict) -> None:
+    if not job.get("shared"):
+        return
+    try:
+        JOBS_DIR.mkdir(exist_ok=True)
+        tmp = JOBS_DIR / f"{job['id']}.{uuid.uuid4().hex}.part"
+        tmp.write_text(json.dumps(job), encoding="utf-8")
+        os.replace(tmp, JOBS_DIR / f"{job['id']}.json")
+    except OSError as exc:
+        print("[JOB STATE]", exc)
+
+
+def _run_job(job_id: str, fn, args: tuple) -> None:
+    job = _jobs[job_id]
+    job["status"] = "running"
+    _save_job(job)
+    try:
+        fn(*args)
+        job["status"] = "done"
+    except Exception as exc:
+        job["status"] = "failed"
+        job["error"] = str(exc)
+        print("[JOB FAILED]", job["kind"], exc)
+    job["finished"] = time.time()
+    _save_job(job)
+
+
+def submit_job(kind: str, fn, *args, shared: bool = False) -> str:
+    """
+    Queue fn(*args) on the job pool and return its job id. Pass shared=True
+    when the id is returned to a client, so any worker can report on it.
+    """
+    job_id = uuid.uuid4().hex
+    job = {"id": job_id, "kind": kind, "status": "queued", "created": time.time(), "shared": shared}
+
+    with _jobs_lock:
+        _jobs[job_id] = job
+
+        # Forget the oldest finished jobs once the history is full
+        if len(_jobs) > JOB_HISTORY:
+            for old_id in [j for j, job in _jobs.items() if "finished" in job][:len(_jobs) - JOB_HISTORY]:
+                del _jobs[old_id]
+
+    _save_job(job)
+    job_executor.submit(_run_job, job_id, fn, args)
+    return job_id
+
 
-app = FastAPI()
+def cleanup_old_jobs() -> None:
+    cutoff = time.time() - 3600
+    for p in JOBS_DIR.glob("*.json") if JOBS_DIR.exists() else []:
+        try:
+            if p.stat().st_mtime < cutoff:
+                p.unlink()
+        except OSError:
+            pass
+
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    job = _jobs.get(job_id)
+    if job is not None:
+        return job
+
+    if job_id.isalnum():
+        try:
+            return json.loads((JOBS_DIR / f"{job_id}.json").read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            pass
+
+    raise HTTPException(status_code=404, detail="Job not found")
 
 # =========================
 # CORE ROUTES
@@ -32,11 +185,447 @@ def hack_index():
     return FileResponse(HACK_DIR / "index.html")
 
 
+@app.get("/healthz")
+def healthz():
+    """Cheap readiness probe used by the launcher"""
+    return {"status": "ok"}
+
+
+@app.get("/healthz/startup")
+def startup_report():
+    """How long app.py took to import and to become ready (ms)"""
+    return STARTUP_REPORT
+
+
+# One worker thread plays the console effect; at most EFFECT_QUEUE_SIZE more
+# triggers wait behind it and anything beyond that is rejected, so spamming
+# HACK can't pile up threads or interleave output.
+EFFECT_QUEUE_SIZE = 1
+
+# With several server workers each has its own queue, but they share one
+# console: a lock file makes them take turns.
+EFFECT_LOCK = CACHE_DIR / "effect.lock"
+EFFECT_LOCK_STALE_SECONDS = 120
+
+_effect_queue: queue.Queue = queue.Queue(maxsize=EFFECT_QUEUE_SIZE)
+_effect_worker: threading.Thread | None = None
+_effect_running = threading.Event()
+_effect_lock = threading.Lock()
+
+
+def _acquire_effect_lock() -> None:
+    while True:
+        try:
+            os.close(os.open(EFFECT_LOCK, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return
+        except FileExistsError:
+            try:
+                # A worker that crashed mid-effect never released it
+                if time.time() - EFFECT_LOCK.stat().st_mtime > EFFECT_LOCK_STALE_SECONDS:
+                    EFFECT_LOCK.unlink(missing_ok=True)
+                    continue
+            except FileNotFoundError:
+                continue
+            time.sleep(0.1)
+
+
+def _run_effects() -> None:
+    from matrix import matrix_burst
+
+    while True:
+        _effect_queue.get()
+        _effect_running.set()
+        try:
+            _acquire_effect_lock()
+            try:
+                matrix_burst()
+            finally:
+                EFFECT_LOCK.unlink(missing_ok=True)
+        except Exception as exc:
+            print("[EFFECT FAILED]", exc)
+        finally:
+            _effect_running.clear()
+
+
+def _ensure_effect_worker() -> None:
+    global _effect_worker
+    with _effect_lock:
+        if _effect_worker is None:
+            _effect_worker = threading.Thread(target=_run_effects, name="matrix-effect", daemon=True)
+            _effect_worker.start()
+
+
 @app.get("/hack-trigger")
 def hack_trigger():
     """Trigger Matrix terminal output"""
-    threading.Thread(target=matrix_burst, daemon=True).start()
-    return {"status": "ACCESS GRANTED"}
+    _ensure_effect_worker()
+    busy = _effect_running.is_set() or not _effect_queue.empty()
+
+    try:
+        _effect_queue.put_nowait(None)
+    except queue.Full:
+        return JSONResponse(
+            status_code=429,
+            content={"status": "BUSY", "detail": "Matrix effect already queued"}
+        )
+
+    return {"status": "ACCESS GRANTED", "effect": "queued" if busy else "started"}
+
+
+# =========================
+# MATRIX STREAM (SSE)
+# =========================
+# Browsers can watch the rain live from /hack/stream. One generator task
+# produces each frame once and fans the encoded event out to every
+# connected client. Each client has a small bounded buffer; a slow client
+# loses its oldest frames instead of slowing everyone else down. The
+# generator only runs while somebody is watching.
+
+STREAM_FRAME_SECONDS = 0.05
+STREAM_WIDTH = 120
+STREAM_BATCH_ROWS = 40
+STREAM_CLIENT_BUFFER = 16
+
+_stream_clients: set[asyncio.Queue] = set()
+_stream_task: asyncio.Task | None = None
+
+
+async def _broadcast_rain() -> None:
+    global _stream_task
+    from matrix import rain_rows
+
+    try:
+        while _stream_clients:
+            for row in rain_rows(STREAM_BATCH_ROWS, STREAM_WIDTH):
+                if not _stream_clients:
+                    break
+                event = f"data: {row}\n\n".encode("ascii")
+                for client in list(_stream_clients):
+                    if client.full():
+                        client.get_nowait()
+                    client.put_nowait(event)
+                await asyncio.sleep(STREAM_FRAME_SECONDS)
+    finally:
+        _stream_task = None
+
+
+@app.get("/hack/stream")
+async def hack_stream():
+    """Server-Sent Events stream of matrix rain, one line per event"""
+    global _stream_task
+    client: asyncio.Queue = asyncio.Queue(maxsize=STREAM_CLIENT_BUFFER)
+    _stream_clients.add(client)
+    if _stream_task is None:
+        _stream_task = asyncio.create_task(_broadcast_rain())
+
+    async def events():
+        try:
+            yield b"retry: 2000\n\n"
+            while True:
+                yield await client.get()
+        finally:
+            _stream_clients.discard(client)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+# =========================
+# PROJECT INDEX
+# =========================
+# /projects is served from an in-memory index instead of walking WEB_DIR on
+# every call. The index is built once at startup, updated by the endpoints
+# that create/delete/upload projects, and reconciled by a polling watcher
+# for changes made outside the app (Explorer, git, a shared volume...).
+
+INDEX_POLL_SECONDS = float(os.environ.get("MATRIX_INDEX_POLL_SECONDS", "2"))
+INDEX_RESCAN_SECONDS = float(os.environ.get("MATRIX_INDEX_RESCAN_SECONDS", "30"))
+
+_index_lock = threading.Lock()
+_index_projects: set[str] | None = None
+_index_mtime: int | None = None
+_index_body = b""
+_index_etag = ""
+_index_stop = threading.Event()
+_index_watcher: threading.Thread | None = None
+
+
+def _is_project_dir(p: Path) -> bool:
+    # Dot-folders are upload staging/trash areas, never projects
+    return not p.name.startswith(".") and p.is_dir() and (p / "index.html").exists()
+
+
+def _scan_projects() -> set[str]:
+    return {p.name for p in WEB_DIR.iterdir() if _is_project_dir(p)}
+
+
+def _publish_index(projects: set[str]) -> None:
+    """Store a new index and pre-render the /projects payload (lock held)."""
+    global _index_projects, _index_body, _index_etag
+    _index_projects = projects
+    _index_body = json.dumps({"projects": sorted(projects)}).encode("utf-8")
+    _index_etag = '"' + hashlib.sha1(_index_body).hexdigest() + '"'
+
+
+def rebuild_project_index() -> None:
+    global _index_mtime
+    mtime = WEB_DIR.stat().st_mtime_ns
+    projects = _scan_projects()
+    with _index_lock:
+        _index_mtime = mtime
+        if projects != _index_projects:
+            _publish_index(projects)
+
+
+def refresh_project(name: str) -> None:
+    """Re-check a single project on disk and update the index if it changed."""
+    present = _is_project_dir(WEB_DIR / name)
+    with _index_lock:
+        if _index_projects is None:
+            return
+        if present == (name in _index_projects):
+            return
+        projects = set(_index_projects)
+        if present:
+            projects.add(name)
+        else:
+            projects.discard(name)
+        _publish_index(projects)
+
+
+def index_is_stale() -> bool:
+    # A child being added, removed or renamed bumps WEB_DIR's mtime - whether
+    # this worker did it or another one. index.html appearing inside an
+    # existing folder does not, so the watcher also rescans periodically.
+    return _index_projects is None or WEB_DIR.stat().st_mtime_ns != _index_mtime
+
+
+def _watch_projects() -> None:
+    # The first full scan happens here rather than in the lifespan, so a
+    # huge WEB_DIR doesn't delay startup (/projects scans itself if asked
+    # before this finishes). If it fails (a shared volume not mounted yet),
+    # the loop keeps retrying rather than the thread dying.
+    last_rescan = None
+    try:
+        rebuild_project_index()
+        last_rescan = time.monotonic()
+    except OSError as exc:
+        print("[INDEX WATCHER]", exc)
+
+    while not _index_stop.wait(INDEX_POLL_SECONDS):
+        try:
+            now = time.monotonic()
+            if last_rescan is None or index_is_stale() or now - last_rescan >= INDEX_RESCAN_SECONDS:
+                rebuild_project_index()
+                last_rescan = now
+        except OSError as exc:
+            print("[INDEX WATCHER]", exc)
+
+
+def start_project_index() -> None:
+    global _index_watcher
+    _index_stop.clear()
+    _index_watcher = threading.Thread(target=_watch_projects, name="project-index", daemon=True)
+    _index_watcher.start()
+
+
+def stop_project_index() -> None:
+    _index_stop.set()
+
+
+# =========================
+# BLOB STORE
+# =========================
+# Project files are deduplicated by content: each distinct file is kept once
+# as .cache/blobs/<sha[:2]>/<sha> and project files are hard links to it, so
+# disk use and page cache grow with unique content, not with the number of
+# near-identical projects. A blob's link count is its reference count: when
+# only the store's own link is left, no project uses it and the collector
+# (run after project deletes) removes it.
+# This relies on nothing editing project files in place. The app's saves,
+# uploads and fingerprinting all write a new file and rename it over the
+# old one, which leaves other projects' links alone - but an outside editor
+# that saves in place changes every project sharing the file. So it is off
+# unless MATRIX_DEDUP=1.
+
+BLOBS_DIR = CACHE_DIR / "blobs"
+BLOB_DEDUP = os.environ.get("MATRIX_DEDUP", "0") == "1"
+
+# A blob with no project links is only collected once it is this old, so
+# one that is being linked into a new project right now is left alone
+BLOB_GC_GRACE_SECONDS = 60
+
+
+def _blob_path(sha: str) -> Path:
+    return BLOBS_DIR / sha[:2] / sha
+
+
+def _blob_ok(blob: Path, sha: str) -> bool:
+    """Whether the blob exists and still holds sha; drops it if it doesn't."""
+    try:
+        st = blob.stat()
+    except FileNotFoundError:
+        return False
+
+    if file_sha256(blob, st) == sha:
+        return True
+
+    # Edited in place behind the app's back: stop handing it out
+    blob.unlink(missing_ok=True)
+    return False
+
+
+def intern_file(path: Path, sha: str) -> None:
+    """
+    Turn a freshly written file into a link to the blob for its content,
+    creating the blob from it if this content is new. Anything that stops
+    the link (no hard links on this drive, link limit, a racing collector)
+    just leaves the plain file.
+    """
+    # The manifest is per-project state the app rewrites: never share it
+    if not BLOB_DEDUP or path.name == PROJECT_MANIFEST:
+        return
+
+    blob = _blob_path(sha)
+    try:
+        if not _blob_ok(blob, sha):
+            blob.parent.mkdir(parents=True, exist_ok=True)
+            os.link(path, blob)
+            remember_sha256(blob, blob.stat(), sha)
+            return
+
+        tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex}.part")
+        os.link(blob, tmp)
+        try:
+            os.replace(tmp, path)
+        except OSError:
+            tmp.unlink(missing_ok=True)
+            raise
+    except OSError:
+        pass
+
+
+def write_blob_file(dest: Path, data: bytes, sha: str) -> None:
+    """Create dest holding data, as a link to the shared blob when possible."""
+    if BLOB_DEDUP:
+        blob = _blob_path(sha)
+        try:
+            if not _blob_ok(blob, sha):
+                blob.parent.mkdir(parents=True, exist_ok=True)
+                atomic_write_bytes(blob, data)
+                remember_sha256(blob, blob.stat(), sha)
+            os.link(blob, dest)
+            return
+        except OSError:
+            pass
+
+    dest.write_bytes(data)
+
+
+def collect_blobs() -> int:
+    """Remove blobs no project links to any more; returns how many."""
+    if not BLOBS_DIR.exists():
+        return 0
+
+    cutoff = time.time() - BLOB_GC_GRACE_SECONDS
+    removed = 0
+    for shard in BLOBS_DIR.iterdir():
+        if not shard.is_dir():
+            continue
+        for blob in shard.iterdir():
+            try:
+                st = blob.stat()
+                if st.st_nlink == 1 and st.st_mtime < cutoff:
+                    blob.unlink()
+                    removed += 1
+            except OSError:
+                pass  # gone already, or open (Windows): next time
+    return removed
+
+
+def remove_project_tree(path: Path) -> None:
+    """Delete a project folder that was moved aside, then the blobs only it used."""
+    shutil.rmtree(path)
+    collect_blobs()
+    collect_compressed()
+
+
+# =========================
+# PROJECT TEMPLATES
+# =========================
+# New projects are copied from a starter kit in templates/<kit>/. A kit is
+# read once (and again only if its files change). Files mentioning
+# {{project_name}} are rendered per project; everything else comes from the
+# blob store, so every project made from a kit shares one copy of it.
+
+DEFAULT_TEMPLATE = "starter"
+TEMPLATE_PLACEHOLDER = b"{{project_name}}"
+BULK_CREATE_MAX = 1000
+
+# kit -> (signature of its files, [(relpath, data, sha256)])
+_templates: dict[str, tuple[tuple, list[tuple[str, bytes, str]]]] = {}
+_templates_lock = threading.Lock()
+
+
+def list_templates() -> list[str]:
+    if not TEMPLATES_DIR.is_dir():
+        return []
+    return sorted(p.name for p in TEMPLATES_DIR.iterdir() if p.is_dir() and not p.name.startswith("."))
+
+
+def load_template(kit: str) -> list[tuple[str, bytes, str]]:
+    if not kit.replace("-", "").replace("_", "").isalnum():
+        raise HTTPException(status_code=400, detail="Invalid template name")
+
+    kit_dir = TEMPLATES_DIR / kit
+    if not kit_dir.is_dir():
+        raise HTTPException(status_code=404, detail="Template not found")
+
+    paths = []
+    for p in sorted(kit_dir.rglob("*")):
+        rel = p.relative_to(kit_dir).as_posix()
+        if p.is_file() and not any(part.startswith(".") for part in rel.split("/")):
+            paths.append((rel, p))
+
+    signature = tuple((rel, p.stat().st_mtime_ns, p.stat().st_size) for rel, p in paths)
+    with _templates_lock:
+        cached = _templates.get(kit)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+
+    files = []
+    for rel, p in paths:
+        data = p.read_bytes()
+        files.append((rel, data, hashlib.sha256(data).hexdigest()))
+
+    with _templates_lock:
+        _templates[kit] = (signature, files)
+    return files
+
+
+def materialize_template(files: list[tuple[str, bytes, str]], dest_dir: Path, project_name: str) -> list[str]:
+    """Create a kit's files in dest_dir and return their relative paths."""
+    name = project_name.encode("utf-8")
+    written = []
+
+    for rel, data, sha in files:
+        dest = dest_dir / rel
+        dest.parent.mkdir(parents=True, exist_ok=True)
+
+        if TEMPLATE_PLACEHOLDER in data:
+            data = data.replace(TEMPLATE_PLACEHOLDER, name)
+            sha = hashlib.sha256(data).hexdigest()
+            dest.write_bytes(data)
+        else:
+            write_blob_file(dest, data, sha)
+
+        remember_sha256(dest, dest.stat(), sha)
+        written.append(rel)
+
+    return written
 
 
 # =========================
@@ -44,189 +633,328 @@ def hack_trigger():
 # =========================
 
 @app.get("/projects")
-def list_projects():
-    projects = []
-    for p in WEB_DIR.iterdir():
-        if p.is_dir() and (p / "index.html").exists():
-            projects.append(p.name)
-    return {"projects": sorted(projects)}
+def list_projects(request: Request):
+    # One stat keeps every worker's index in step with the others' changes
+    if index_is_stale():
+        rebuild_project_index()
+
+    body, etag = _index_body, _index_etag
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    return Response(content=body, media_type="application/json", headers=headers)
 
 
 @app.post("/projects/new/{project_name}")
-def create_project(project_name: str):
+async def create_project(
+    project_name: str,
+    fingerprint: bool = Query(False),
+    template: str = Query(DEFAULT_TEMPLATE)
+):
     # Allow simple, safe names only
     if not project_name.replace("-", "").replace("_", "").isalnum():
         raise HTTPException(status_code=400, detail="Invalid project name")
 
+    return await run_io(_scaffold_project, project_name, fingerprint, template)
+
+
+def _scaffold_project(
+    project_name: str,
+    fingerprint: bool = False,
+    template: str = DEFAULT_TEMPLATE,
+    template_files: list[tuple[str, bytes, str]] | None = None
+) -> dict:
     project_dir = WEB_DIR / project_name
 
     if project_dir.exists():
         raise HTTPException(status_code=400, detail="Project already exists")
 
-    project_dir.mkdir()
-
-    index_html = f"""<!DOCTYPE html>
-    <html lang="en">
-    <head>
-        <meta charset="UTF-8" />
-        <title>{project_name}</title>
-        <meta name="viewport" content="width=device-width, initial-scale=1.0" />
-
-        <!-- Styles -->
-        <link rel="stylesheet" href="style.css" />
-    </head>
-    <body>
-
-    <header class="site-header">
-        <div class="container">
-            <h1>{project_name}</h1>
-            <p class="tagline">Built inside the Matrix</p>
-        </div>
-    </header>
-
-    <main class="container">
-        <section class="card">
-            <h2>Welcome 👋</h2>
-            <p>
-                This is your new website.  
-                Edit the HTML, CSS, and JavaScript directly from the Matrix editor.
-            </p>
-
-            <button id="actionBtn">Click me</button>
-        </section>
-    </main>
-
-    <footer class="site-footer">
-        <div class="container">
-            <p>© {project_name}</p>
-        </div>
-    </footer>
-
-    <script src="script.js"></script>
-    </body>
-    </html>
-    """
+    if template_files is None:
+        template_files = load_template(template)
 
-    style_css = """/* === Modern Starter Styles === */
+    # Build the project off to the side and rename it in, so it appears
+    # complete (for every worker's index) or not at all
+    staging_dir = _staging_dir(project_name)
+    staging_dir.mkdir()
 
-    :root {
-        --bg: #0f172a;
-        --card: #111827;
-        --text: #e5e7eb;
-        --muted: #9ca3af;
-        --accent: #22c55e;
-        --border: #1f2933;
-    }
+    try:
+        files = materialize_template(template_files, staging_dir, project_name)
 
-    * {
-        box-sizing: border-box;
-    }
+        if fingerprint:
+            assets, _ = fingerprint_project(staging_dir, project_name)
+            files = [assets.get(f, f) for f in files]
 
-    body {
-        margin: 0;
-        font-family: system-ui, -apple-system, BlinkMacSystemFont, "Segoe UI",
-            Roboto, Ubuntu, Cantarell, "Helvetica Neue", Arial, sans-serif;
-        background: linear-gradient(180deg, #020617, var(--bg));
-        color: var(--text);
-        line-height: 1.6;
-    }
+        if project_dir.exists():
+            raise HTTPException(status_code=400, detail="Project already exists")
+        _rename_dir(staging_dir, project_dir)
+    except BaseException:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        raise
 
-    /* Layout */
-    .container {
-        max-width: 900px;
-        margin: 0 auto;
-        padding: 24px;
-    }
+    # Hashes were recorded for the staging paths; the files are unchanged
+    for rel in files:
+        cached = _file_hashes.pop(str(staging_dir / rel), None)
+        if cached is not None:
+            _file_hashes[str(project_dir / rel)] = cached
 
-    /* Header */
-    .site-header {
-        border-bottom: 1px solid var(--border);
-    }
-
-    .site-header h1 {
-        margin: 0;
-        font-size: 2.5rem;
-    }
+    refresh_project(project_name)
+    schedule_prepare_assets([project_dir / f for f in files])
 
-    .tagline {
-        margin-top: 8px;
-        color: var(--muted);
+    return {
+        "status": "created",
+        "project": project_name,
+        "template": template,
+        "files": files
     }
 
-    /* Card */
-    .card {
-        background: var(--card);
-        border: 1px solid var(--border);
-        border-radius: 12px;
-        padding: 32px;
-        margin-top: 40px;
-        box-shadow: 0 10px 30px rgba(0, 0, 0, 0.3);
-    }
 
-    .card h2 {
-        margin-top: 0;
-    }
+class BulkCreate(BaseModel):
+    names: list[str]
+    template: str = DEFAULT_TEMPLATE
+    fingerprint: bool = False
 
-    /* Button */
-    button {
-        margin-top: 20px;
-        padding: 12px 20px;
-        font-size: 1rem;
-        border-radius: 8px;
-        border: none;
-        cursor: pointer;
-        background: var(--accent);
-        color: #022c22;
-        font-weight: 600;
-        transition: transform 0.1s ease, box-shadow 0.1s ease;
-    }
 
-    button:hover {
-        transform: translateY(-1px);
-        box-shadow: 0 6px 20px rgba(34, 197, 94, 0.35);
-    }
+@app.post("/projects/bulk")
+async def create_projects(data: BulkCreate = Body(...)):
+    if len(data.names) > BULK_CREATE_MAX:
+        raise HTTPException(status_code=400, detail=f"At most {BULK_CREATE_MAX} projects per call")
 
-    /* Footer */
-    .site-footer {
-        margin-top: 80px;
-        border-top: 1px solid var(--border);
-        color: var(--muted);
-        font-size: 0.9rem;
-    }
-    """
+    return await run_io(_scaffold_many, data)
 
-    script_js = """// === Modern Starter Script ===
 
-    console.log("Site loaded");
+def _scaffold_many(data: BulkCreate) -> dict:
+    template_files = load_template(data.template)
+    created = []
+    failed = {}
 
-    document.getElementById("actionBtn").addEventListener("click", () => {
-        alert("Hello from the Matrix 👾");
-    });
-    """
+    for name in data.names:
+        if not name.replace("-", "").replace("_", "").isalnum():
+            failed[name] = "Invalid project name"
+            continue
+        try:
+            _scaffold_project(name, data.fingerprint, data.template, template_files)
+            created.append(name)
+        except HTTPException as exc:
+            failed[name] = exc.detail
 
+    return {"status": "created", "template": data.template, "created": created, "failed": failed}
 
-    (project_dir / "index.html").write_text(index_html, encoding="utf-8")
-    (project_dir / "style.css").write_text(style_css, encoding="utf-8")
-    (project_dir / "script.js").write_text(script_js, encoding="utf-8")
 
-    return {
-        "status": "created",
-        "project": project_name,
-        "files": ["index.html", "style.css", "script.js"]
-    }
+@app.get("/templates")
+async def get_templates():
+    return {"templates": await run_io(list_templates), "default": DEFAULT_TEMPLATE}
 
 @app.delete("/projects/delete/{project_name}")
-def delete_project(project_name: str):
+async def delete_project(project_name: str):
     if not project_name.replace("-", "").replace("_", "").isalnum():
         raise HTTPException(status_code=400, detail="Invalid project name")
 
     project_dir = WEB_DIR / project_name
 
-    if not project_dir.exists():
+    if not await run_io(project_dir.exists):
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    # Renaming is instant, so the project disappears right away; the actual
+    # rmtree runs as a background job the client can poll.
+    trash_dir = await run_io(_move_aside, project_dir)
+    hot_cache.invalidate_tree(project_dir)
+    await run_io(forget_sha256_tree, project_dir)
+    await run_io(refresh_project, project_name)
+    job_id = submit_job("delete", remove_project_tree, trash_dir, shared=True)
+
+    return JSONResponse(
+        status_code=202,
+        content={"status": "deleting", "project": project_name, "job_id": job_id}
+    )
+
+
+# =========================
+# PROJECT EXPORT
+# =========================
+# A project is archived by a writer thread straight into the response: the
+# zip/tar writer's output is cut into chunks and handed over through a small
+# bounded queue, so an export holds a few chunks in memory whatever the
+# project's size, and a slow download slows the compression down with it.
+
+EXPORT_FORMATS = {
+    "zip": ("application/zip", ".zip"),
+    "tar.gz": ("application/gzip", ".tar.gz"),
+}
+EXPORT_CHUNK_SIZE = 256 * 1024
+EXPORT_QUEUE_CHUNKS = 8
+EXPORT_MAX_RUNNING = 4
+
+# Already compressed: deflating them again only costs time
+EXPORT_STORED_EXTS = {
+    ".png", ".jpg", ".jpeg", ".gif", ".webp", ".ico",
+    ".woff", ".woff2", ".mp3", ".mp4", ".webm",
+    ".zip", ".gz", ".br", ".pdf",
+}
+
+_exports_running = threading.BoundedSemaphore(EXPORT_MAX_RUNNING)
+
+
+class _ExportCancelled(Exception):
+    pass
+
+
+class _ChunkWriter:
+    """Write-only file object for zipfile/tarfile that emits fixed-size chunks."""
+
+    def __init__(self, put):
+        self.put = put
+        self.buffer = bytearray()
+
+    def write(self, data) -> int:
+        self.buffer += data
+        while len(self.buffer) >= EXPORT_CHUNK_SIZE:
+            self.put(bytes(self.buffer[:EXPORT_CHUNK_SIZE]))
+            del self.buffer[:EXPORT_CHUNK_SIZE]
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        if self.buffer:
+            self.put(bytes(self.buffer))
+            self.buffer.clear()
+
+
+class _ExportResponse(StreamingResponse):
+    """StreamingResponse that runs on_close however the response ends."""
+
+    def __init__(self, *args, on_close, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.on_close = on_close
+
+    async def __call__(self, scope, receive, send) -> None:
+        # A client that disconnects before the first chunk can get the body
+        # iterator cancelled before it ever starts, so its finally never runs
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.on_close()
+
+
+def _export_files(project_dir: Path):
+    """(path, archive name) for everything in the project but temp/internal files."""
+    for root, dirs, files in os.walk(project_dir):
+        dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+        for name in sorted(files):
+            if name.startswith(".") and name != PROJECT_MANIFEST:
+                continue
+            path = Path(root) / name
+            if not path.is_symlink():
+                yield path, f"{project_dir.name}/{path.relative_to(project_dir).as_posix()}"
+
+
+def _write_export(project_dir: Path, fmt: str, sink: _ChunkWriter) -> None:
+    if fmt == "zip":
+        with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+            for path, arcname in _export_files(project_dir):
+                try:
+                    info = zipfile.ZipInfo.from_file(path, arcname)
+                    if path.suffix.lower() in EXPORT_STORED_EXTS:
+                        info.compress_type = zipfile.ZIP_STORED
+                    else:
+                        info.compress_type = zipfile.ZIP_DEFLATED
+                    with open(path, "rb") as src, zf.open(info, "w") as dst:
+                        shutil.copyfileobj(src, dst, UPLOAD_CHUNK_SIZE)
+                except FileNotFoundError:
+                    continue  # deleted while exporting
+    else:
+        # gzip by hand: tarfile's own "w|gz" is stuck at level 9 on older Pythons
+        with gzip.GzipFile(fileobj=sink, mode="wb", compresslevel=6) as gz:
+            with tarfile.open(fileobj=gz, mode="w|") as tf:
+                for path, arcname in _export_files(project_dir):
+                    try:
+                        tf.add(path, arcname, recursive=False)
+                    except FileNotFoundError:
+                        continue
+    sink.close()
+
+
+@app.get("/projects/{project_name}/export")
+async def export_project(project_name: str, format: str = Query("zip")):
+    if not _is_safe_project_name(project_name):
+        raise HTTPException(status_code=400, detail="Invalid project name")
+
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="Format must be zip or tar.gz")
+
+    project_dir = WEB_DIR / project_name
+    if not await run_io(_is_project_dir, project_dir):
         raise HTTPException(status_code=404, detail="Project not found")
 
-    shutil.rmtree(project_dir)
-    return {"status": "deleted", "project": project_name}
+    if not _exports_running.acquire(blocking=False):
+        raise HTTPException(status_code=429, detail="Too many exports running, try again shortly")
+
+    loop = asyncio.get_running_loop()
+    chunks: asyncio.Queue = asyncio.Queue(maxsize=EXPORT_QUEUE_CHUNKS)
+    cancelled = threading.Event()
+    started = threading.Event()
+
+    def put(item) -> None:
+        # Blocks while the queue is full - that is the backpressure - but
+        # gives up once the client has gone away
+        if cancelled.is_set():
+            raise _ExportCancelled
+        future = asyncio.run_coroutine_threadsafe(chunks.put(item), loop)
+        while True:
+            try:
+                future.result(timeout=1)
+                return
+            except FutureTimeoutError:
+                if cancelled.is_set():
+                    future.cancel()
+                    raise _ExportCancelled
+
+    def writer() -> None:
+        try:
+            _write_export(project_dir, format, _ChunkWriter(put))
+            put(None)
+        except _ExportCancelled:
+            pass
+        except Exception as exc:
+            print("[EXPORT FAILED]", project_name, exc)
+            if not cancelled.is_set():
+                put(exc)
+        finally:
+            _exports_running.release()
+
+    def close() -> None:
+        cancelled.set()
+        if not started.is_set():
+            _exports_running.release()  # the writer never ran
+
+    async def stream():
+        # The writer only starts once the body is actually being sent
+        started.set()
+        threading.Thread(target=writer, name=f"export-{project_name}", daemon=True).start()
+        try:
+            while True:
+                item = await chunks.get()
+                if item is None:
+                    return
+                if isinstance(item, Exception):
+                    raise item  # aborts the download rather than ending it cleanly
+                yield item
+        finally:
+            cancelled.set()
+
+    media_type, ext = EXPORT_FORMATS[format]
+    return _ExportResponse(
+        stream(),
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="{project_name}{ext}"',
+            "Cache-Control": "no-store",
+        },
+        on_close=close,
+    )
 
 
 # =========================
@@ -235,18 +963,32 @@ def delete_project(project_name: str):
 
 ALLOWED_EXTS = {".html", ".css", ".js"}
 
+class FilePatch(BaseModel):
+    # Offsets are UTF-16 code units, as the browser counts them
+    start: int
+    end: int
+    text: str
+
+
 class FileUpdate(BaseModel):
-    content: str
+    # Either the full new content, or a patch against the version the
+    # editor loaded plus the resulting length as a sanity check
+    content: str | None = None
+    base_version: str | None = None
+    patch: FilePatch | None = None
+    length: int | None = None
 
 
 def safe_editor_path(project: str, file: str) -> Path:
     if not project.replace("-", "").replace("_", "").isalnum():
         raise HTTPException(status_code=400, detail="Invalid project name")
 
-    if ".." in file or "/" in file or "\\" in file:
-        raise HTTPException(status_code=400, detail="Invalid file path")
+    # Nested files are fine (the tree lists them), escaping the project isn't
+    project_dir = (WEB_DIR / project).resolve()
+    path = (project_dir / _safe_relpath(file)).resolve()
 
-    path = (WEB_DIR / project / file).resolve()
+    if project_dir not in path.parents:
+        raise HTTPException(status_code=400, detail="Invalid file path")
 
     if not path.exists():
         raise HTTPException(status_code=404, detail="File not found")
@@ -269,6 +1011,50 @@ UPLOAD_ALLOWED_EXTS = {
     ".txt", ".json", ".map"
 }
 
+# Uploads are streamed to disk in fixed-size chunks so memory stays flat no
+# matter how big the folder is. A multipart body is spooled to temp files by
+# the form parser before the handler runs, so the request cap is also
+# enforced on the raw body as it arrives (and up front from Content-Length);
+# the handler then applies the per-file cap while copying into staging.
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+UPLOAD_MAX_FILE_BYTES = int(os.environ.get("MATRIX_UPLOAD_MAX_FILE_BYTES", 1024 ** 3))
+UPLOAD_MAX_REQUEST_BYTES = int(os.environ.get("MATRIX_UPLOAD_MAX_REQUEST_BYTES", 4 * 1024 ** 3))
+MULTIPART_UPLOAD_PATHS = {"/upload/project"}
+
+
+class UploadSizeLimit:
+    """ASGI middleware: 413 for multipart uploads whose body passes the request cap."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or scope["path"] not in MULTIPART_UPLOAD_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        length = Headers(scope=scope).get("content-length", "")
+        if length.isdigit() and int(length) > UPLOAD_MAX_REQUEST_BYTES:
+            await JSONResponse({"detail": "Upload too large"}, status_code=413)(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > UPLOAD_MAX_REQUEST_BYTES:
+                    # Raised inside form parsing, which passes it on as the response
+                    raise HTTPException(status_code=413, detail="Upload too large")
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+app.add_middleware(UploadSizeLimit)
+
 def _is_safe_project_name(name: str) -> bool:
     return bool(name) and name.replace("-", "").replace("_", "").isalnum()
 
@@ -287,11 +1073,148 @@ def _safe_relpath(rel: str) -> Path:
         raise HTTPException(status_code=400, detail="Invalid path traversal")
     return p
 
+STAGING_PREFIX = ".staging-"
+TRASH_PREFIX = ".trash-"
+
+def _staging_dir(project_name: str) -> Path:
+    return WEB_DIR / f"{STAGING_PREFIX}{project_name}-{uuid.uuid4().hex}"
+
+def _rename_dir(src: Path, dst: Path) -> None:
+    # Windows refuses to rename a folder while a file inside it is open
+    # (e.g. being served to a visitor), so retry briefly.
+    for attempt in range(10):
+        try:
+            os.replace(src, dst)
+            return
+        except PermissionError:
+            if attempt == 9:
+                raise
+            time.sleep(0.05 * (attempt + 1))
+
+def _move_aside(project_dir: Path) -> Path:
+    """Rename a project folder to a trash folder and return the new path."""
+    trash_dir = WEB_DIR / f"{TRASH_PREFIX}{project_dir.name}-{uuid.uuid4().hex}"
+    _rename_dir(project_dir, trash_dir)
+    return trash_dir
+
+def _swap_into_place(staging_dir: Path, dest_dir: Path) -> None:
+    """
+    Move a fully written staging folder to dest_dir. Any existing project is
+    renamed aside first and deleted by a background job, so the live folder
+    is only ever the old tree or the new one.
+    """
+    trash_dir = _move_aside(dest_dir) if dest_dir.exists() else None
+    try:
+        _rename_dir(staging_dir, dest_dir)
+    except BaseException:
+        # Put the live project back before the staging copy is thrown away
+        if trash_dir is not None:
+            _rename_dir(trash_dir, dest_dir)
+        raise
+
+    if trash_dir is not None:
+        submit_job("discard", remove_project_tree, trash_dir)
+
+STALE_STAGING_SECONDS = 6 * 3600
+
+def cleanup_stale_uploads() -> None:
+    """
+    Remove staging/trash folders left behind by a crash or restart. Staging
+    folders must also be old: another worker may still be filling one.
+    """
+    cutoff = time.time() - STALE_STAGING_SECONDS
+    for p in WEB_DIR.iterdir():
+        if not p.is_dir():
+            continue
+        if p.name.startswith(TRASH_PREFIX) or (p.name.startswith(STAGING_PREFIX) and p.stat().st_mtime < cutoff):
+            shutil.rmtree(p, ignore_errors=True)
+
+    collect_blobs()
+    collect_compressed(orphans=False)
+
+async def _save_upload(uf: UploadFile, out_path: Path, remaining: int) -> tuple[int, str]:
+    """
+    Stream an UploadFile into a temp file next to out_path, then rename it
+    into place. Raises 413 once the per-file cap or the remaining per-request
+    budget is exceeded. Returns the number of bytes written and their SHA-256.
+    """
+    if uf.size is not None and uf.size > UPLOAD_MAX_FILE_BYTES:
+        raise HTTPException(status_code=413, detail=f"File too large: {uf.filename}")
+
+    tmp_path = out_path.with_name(f".{out_path.name}.{uuid.uuid4().hex}.part")
+    written = 0
+    h = hashlib.sha256()
+
+    try:
+        out = await run_io(open, tmp_path, "wb")
+        try:
+            while chunk := await uf.read(UPLOAD_CHUNK_SIZE):
+                written += len(chunk)
+                if written > UPLOAD_MAX_FILE_BYTES:
+                    raise HTTPException(status_code=413, detail=f"File too large: {uf.filename}")
+                if written > remaining:
+                    raise HTTPException(status_code=413, detail="Upload too large")
+                h.update(chunk)
+                await run_io(out.write, chunk)
+        finally:
+            await run_io(out.close)
+        await run_io(os.replace, tmp_path, out_path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+    return written, h.hexdigest()
+
+async def _publish_upload(
+    project_name: str,
+    staging_dir: Path,
+    dest_dir: Path,
+    overwrite: bool,
+    fingerprint: bool,
+    saved_files: list[tuple[Path, os.stat_result, str]]
+) -> bool:
+    """
+    Swap a filled staging folder in as the project (fingerprinting it first
+    if asked) and bring the caches up to date. Returns whether the project
+    has an index.html.
+    """
+    try:
+        prepare = [path for path, _, _ in saved_files]
+        if fingerprint:
+            _, changed = await run_io(fingerprint_project, staging_dir, project_name)
+            prepare += [dest_dir / rel for rel in changed]
+
+        if dest_dir.exists() and not overwrite:
+            raise HTTPException(status_code=400, detail="Project already exists (enable overwrite)")
+
+        await run_io(_swap_into_place, staging_dir, dest_dir)
+        hot_cache.invalidate_tree(dest_dir)
+    except BaseException:
+        await run_io(shutil.rmtree, staging_dir, ignore_errors=True)
+        await run_io(forget_sha256_tree, staging_dir)
+        raise
+
+    # Helpful: ensure an index.html exists at project root (optional)
+    has_index = await run_io((dest_dir / "index.html").exists)
+    await run_io(refresh_project, project_name)
+
+    # The old files are gone, and fingerprinting hashed the staging paths.
+    # The rename keeps mtime/size, so the hashes taken while streaming stay valid
+    await run_io(forget_sha256_tree, dest_dir)
+    await run_io(forget_sha256_tree, staging_dir)
+    for path, st, sha in saved_files:
+        remember_sha256(path, st, sha)
+    forget_cache_policy(project_name)
+    schedule_prepare_assets(prepare)
+
+    return has_index
+
 @app.post("/upload/project")
 async def upload_project_folder(
     project_name: str = Form(...),
     root_folder: str = Form(...),
     overwrite: bool = Form(False),
+    fingerprint: bool = Form(False),
     files: list[UploadFile] = File(...)
 ):
     """
@@ -310,48 +1233,56 @@ async def upload_project_folder(
     if WEB_DIR.resolve() not in dest_dir.parents:
         raise HTTPException(status_code=400, detail="Invalid destination")
 
-    if dest_dir.exists():
-        if not overwrite:
-            raise HTTPException(status_code=400, detail="Project already exists (enable overwrite)")
-        shutil.rmtree(dest_dir)
+    if dest_dir.exists() and not overwrite:
+        raise HTTPException(status_code=400, detail="Project already exists (enable overwrite)")
 
-    dest_dir.mkdir(parents=True, exist_ok=True)
+    # Write into a staging folder and swap it in at the end, so visitors
+    # never see a half-uploaded (or half-deleted) site.
+    staging_dir = _staging_dir(project_name)
+    await run_io(staging_dir.mkdir)
 
     saved = 0
     skipped = 0
+    total_bytes = 0
+    saved_files = []
 
-    for uf in files:
-        # uf.filename will contain the relative path (often includes the chosen folder root)
-        rel = uf.filename.replace("\\", "/")
+    try:
+        for uf in files:
+            # uf.filename will contain the relative path (often includes the chosen folder root)
+            rel = uf.filename.replace("\\", "/")
 
-        # Strip the selected root folder prefix if present
-        prefix = root_folder.strip("/").strip("\\") + "/"
-        if rel.startswith(prefix):
-            rel = rel[len(prefix):]
+            # Strip the selected root folder prefix if present
+            prefix = root_folder.strip("/").strip("\\") + "/"
+            if rel.startswith(prefix):
+                rel = rel[len(prefix):]
 
-        # If the browser sends just a filename sometimes, keep it
-        rel_path = _safe_relpath(rel)
+            # If the browser sends just a filename sometimes, keep it
+            rel_path = _safe_relpath(rel)
 
-        # Extension allowlist (skip silently or error; here we skip)
-        ext = rel_path.suffix.lower()
-        if ext and ext not in UPLOAD_ALLOWED_EXTS:
-            skipped += 1
-            continue
+            # Extension allowlist (skip silently or error; here we skip)
+            ext = rel_path.suffix.lower()
+            if ext and ext not in UPLOAD_ALLOWED_EXTS:
+                skipped += 1
+                continue
 
-        out_path = (dest_dir / rel_path).resolve()
+            out_path = (staging_dir / rel_path).resolve()
 
-        # Ensure output stays inside dest_dir
-        if dest_dir not in out_path.parents and out_path != dest_dir:
-            raise HTTPException(status_code=400, detail="Invalid upload path")
+            # Ensure output stays inside the staging folder
+            if staging_dir not in out_path.parents:
+                raise HTTPException(status_code=400, detail="Invalid upload path")
 
-        out_path.parent.mkdir(parents=True, exist_ok=True)
+            await run_io(out_path.parent.mkdir, parents=True, exist_ok=True)
 
-        data = await uf.read()
-        out_path.write_bytes(data)
-        saved += 1
+            written, sha = await _save_upload(uf, out_path, UPLOAD_MAX_REQUEST_BYTES - total_bytes)
+            await run_io(intern_file, out_path, sha)
+            total_bytes += written
+            saved_files.append((dest_dir / rel_path, await run_io(out_path.stat), sha))
+            saved += 1
+    except BaseException:
+        await run_io(shutil.rmtree, staging_dir, ignore_errors=True)
+        raise
 
-    # Helpful: ensure an index.html exists at project root (optional)
-    has_index = (dest_dir / "index.html").exists()
+    has_index = await _publish_upload(project_name, staging_dir, dest_dir, overwrite, fingerprint, saved_files)
 
     return {
         "status": "ok",
@@ -361,36 +1292,612 @@ async def upload_project_folder(
         "has_index": has_index
     }
 
+# Archive upload: the browser packs the folder into one tar (gzipped when
+# that helps) and posts it as the raw request body. The body is handed to
+# an extractor thread through a small queue as it arrives, and each entry is
+# checked and written into staging the same way as a folder upload's files.
+# Extractors get their own threads, capped like exports: one waits on its
+# client for as long as the upload takes, and on the I/O pool a few slow
+# uploads would starve every other disk call.
+
+ARCHIVE_QUEUE_CHUNKS = 8
+ARCHIVE_MAX_RUNNING = 4
+
+_extractions_running = threading.BoundedSemaphore(ARCHIVE_MAX_RUNNING)
+
+
+class _QueueReader:
+    """Blocking read-only file object over chunks an async producer puts in a queue."""
+
+    def __init__(self, chunks: asyncio.Queue, loop: asyncio.AbstractEventLoop):
+        self.chunks = chunks
+        self.loop = loop
+        self.buffer = bytearray()
+        self.eof = False
+
+    def read(self, size: int = -1) -> bytes:
+        while not self.eof and (size < 0 or len(self.buffer) < size):
+            chunk = asyncio.run_coroutine_threadsafe(self.chunks.get(), self.loop).result()
+            if chunk is None:
+                self.eof = True
+            else:
+                self.buffer += chunk
+
+        if size < 0 or size > len(self.buffer):
+            size = len(self.buffer)
+        data = bytes(self.buffer[:size])
+        del self.buffer[:size]
+        return data
+
+
+def _write_member(src, out_path: Path) -> str:
+    """Copy one archive entry to out_path via a temp file; returns its SHA-256."""
+    tmp_path = out_path.with_name(f".{out_path.name}.{uuid.uuid4().hex}.part")
+    h = hashlib.sha256()
+    try:
+        with open(tmp_path, "wb") as out:
+            while chunk := src.read(UPLOAD_CHUNK_SIZE):
+                h.update(chunk)
+                out.write(chunk)
+        os.replace(tmp_path, out_path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    return h.hexdigest()
+
+
+def _extract_archive(reader, staging_dir: Path, dest_dir: Path) -> tuple[list, int]:
+    saved: dict[Path, tuple[Path, os.stat_result, str]] = {}
+    skipped = 0
+    total_bytes = 0
+
+    try:
+        with tarfile.open(fileobj=reader, mode="r|*") as tf:
+            for member in tf:
+                if member.isdir():
+                    continue
+                if not member.isfile():
+                    skipped += 1  # links, devices...
+                    continue
+
+                rel_path = _safe_relpath(member.name)
+
+                ext = rel_path.suffix.lower()
+                if ext and ext not in UPLOAD_ALLOWED_EXTS:
+                    skipped += 1
+                    continue
+
+                # Sizes are checked before extracting, so a small compressed
+                # archive can't expand past the caps
+                if member.size > UPLOAD_MAX_FILE_BYTES:
+                    raise HTTPException(status_code=413, detail=f"File too large: {member.name}")
+                total_bytes += member.size
+                if total_bytes > UPLOAD_MAX_REQUEST_BYTES:
+                    raise HTTPException(status_code=413, detail="Upload too large")
+
+                out_path = (staging_dir / rel_path).resolve()
+                if staging_dir not in out_path.parents:
+                    raise HTTPException(status_code=400, detail="Invalid upload path")
+
+                out_path.parent.mkdir(parents=True, exist_ok=True)
+                sha = _write_member(tf.extractfile(member), out_path)
+                intern_file(out_path, sha)
+                saved[out_path] = (dest_dir / rel_path, out_path.stat(), sha)
+    except (tarfile.TarError, EOFError) as exc:
+        raise HTTPException(status_code=400, detail=f"Invalid archive: {exc}")
+
+    return list(saved.values()), skipped
+
+
+def start_extraction(reader, staging_dir: Path, dest_dir: Path) -> asyncio.Future:
+    """Run _extract_archive on a thread of its own; 429 if too many are running."""
+    if not _extractions_running.acquire(blocking=False):
+        raise HTTPException(status_code=429, detail="Too many uploads being unpacked, try again shortly")
+
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def settle(result, error) -> None:
+        if future.cancelled():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def run() -> None:
+        try:
+            result, error = _extract_archive(reader, staging_dir, dest_dir), None
+        except BaseException as exc:
+            result, error = None, exc
+        finally:
+            _extractions_running.release()
+        loop.call_soon_threadsafe(settle, result, error)
+
+    threading.Thread(target=run, name=f"extract-{dest_dir.name}", daemon=True).start()
+    return future
+
+
+@app.post("/upload/archive")
+async def upload_project_archive(
+    request: Request,
+    project_name: str = Query(...),
+    overwrite: bool = Query(False),
+    fingerprint: bool = Query(False)
+):
+    """
+    Upload a whole project as one tar or tar.gz body, with paths relative to
+    the project root.
+    """
+    if not _is_safe_project_name(project_name):
+        raise HTTPException(status_code=400, detail="Invalid project name")
+
+    dest_dir = (WEB_DIR / project_name).resolve()
+
+    if dest_dir.exists() and not overwrite:
+        raise HTTPException(status_code=400, detail="Project already exists (enable overwrite)")
+
+    staging_dir = _staging_dir(project_name).resolve()
+    await run_io(staging_dir.mkdir)
+
+    loop = asyncio.get_running_loop()
+    chunks: asyncio.Queue = asyncio.Queue(maxsize=ARCHIVE_QUEUE_CHUNKS)
+    try:
+        extract = start_extraction(_QueueReader(chunks, loop), staging_dir, dest_dir)
+    except BaseException:
+        await run_io(shutil.rmtree, staging_dir, ignore_errors=True)
+        raise
+
+    async def feed(item) -> None:
+        # Wait for room in the queue, unless the extractor already stopped
+        # (end of archive, or a bad entry)
+        put = asyncio.ensure_future(chunks.put(item))
+        await asyncio.wait({put, extract}, return_when=asyncio.FIRST_COMPLETED)
+        if not put.done():
+            put.cancel()
+
+    try:
+        received = 0
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > UPLOAD_MAX_REQUEST_BYTES:
+                raise HTTPException(status_code=413, detail="Upload too large")
+            if extract.done():
+                break
+            if chunk:
+                await feed(chunk)
+        await feed(None)
+    except BaseException:
+        # Too big, or the client went away: unblock the extractor, then
+        # report the original problem
+        if not extract.done():
+            while not chunks.empty():
+                chunks.get_nowait()
+            chunks.put_nowait(None)
+        try:
+            await extract
+        except Exception:
+            pass  # it only failed because the body was cut short
+        await run_io(shutil.rmtree, staging_dir, ignore_errors=True)
+        raise
+
+    try:
+        saved_files, skipped = await extract
+    except BaseException:
+        await run_io(shutil.rmtree, staging_dir, ignore_errors=True)
+        raise
+
+    has_index = await _publish_upload(project_name, staging_dir, dest_dir, overwrite, fingerprint, saved_files)
+
+    return {
+        "status": "ok",
+        "project": project_name,
+        "saved_files": len(saved_files),
+        "skipped_files": skipped,
+        "has_index": has_index
+    }
+
+# Resumable uploads: for big archives the browser opens a session, PUTs the
+# archive in numbered chunks (each one written atomically, so a dropped
+# connection only loses the chunk in flight), asks which chunks arrived
+# after a reconnect, and finalizes. Sessions live on disk, so any worker
+# (or a restarted server) can continue them. The existing project is only
+# replaced at finalize, by the same staging swap as every other upload.
+
+UPLOADS_DIR = CACHE_DIR / "uploads"
+UPLOAD_SESSION_CHUNK = 8 * 1024 * 1024
+UPLOAD_SESSION_MIN_CHUNK = 256 * 1024
+UPLOAD_SESSION_MAX_CHUNK = 64 * 1024 * 1024
+UPLOAD_SESSION_MAX_AGE = 24 * 3600
+
+# A finalize touches its lock file while it runs; one untouched for this
+# long belongs to a server that died mid-finalize
+FINALIZE_LOCK_STALE_SECONDS = 60
+FINALIZE_LOCK_TOUCH_SECONDS = 10
+
+
+class _ChunkFilesReader:
+    """Read-only file object over chunk files, one after the other."""
+
+    def __init__(self, paths: list[Path]):
+        self.paths = iter(paths)
+        self.current = None
+
+    def read(self, size: int = -1) -> bytes:
+        out = bytearray()
+        while size < 0 or len(out) < size:
+            if self.current is None:
+                path = next(self.paths, None)
+                if path is None:
+                    break
+                self.current = open(path, "rb")
+            data = self.current.read(-1 if size < 0 else size - len(out))
+            if not data:
+                self.current.close()
+                self.current = None
+                continue
+            out += data
+        return bytes(out)
+
+    def close(self) -> None:
+        if self.current is not None:
+            self.current.close()
+
+
+def _session_dir(upload_id: str) -> Path:
+    if not upload_id.isalnum():
+        raise HTTPException(status_code=400, detail="Invalid upload id")
+    return UPLOADS_DIR / upload_id
+
+
+def _load_session(upload_id: str) -> tuple[Path, dict]:
+    session_dir = _session_dir(upload_id)
+    try:
+        session = json.loads((session_dir / "session.json").read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    return session_dir, session
+
+
+def _chunk_length(session: dict, index: int) -> int:
+    return min(session["chunk_size"], session["size"] - index * session["chunk_size"])
+
+
+def _session_status(session_dir: Path, session: dict) -> dict:
+    received = sorted(int(p.stem) for p in session_dir.glob("*.chunk") if p.stem.isdigit())
+    # Bytes before the first gap: where a sequential client picks up again
+    offset = 0
+    for i, index in enumerate(received):
+        if index != i:
+            break
+        offset += _chunk_length(session, index)
+    return {
+        "upload_id": session["id"],
+        "project": session["project_name"],
+        "size": session["size"],
+        "chunk_size": session["chunk_size"],
+        "chunks": session["chunks"],
+        "received": received,
+        "offset": offset,
+        "finalized": (session_dir / "result.json").exists(),
+    }
+
+
+def cleanup_upload_sessions() -> None:
+    cutoff = time.time() - UPLOAD_SESSION_MAX_AGE
+    for p in UPLOADS_DIR.iterdir() if UPLOADS_DIR.exists() else []:
+        try:
+            if p.stat().st_mtime < cutoff:
+                shutil.rmtree(p, ignore_errors=True)
+        except OSError:
+            pass
+
+
+def _create_session(session: dict) -> dict:
+    session_dir = _session_dir(session["id"])
+    session_dir.mkdir(parents=True)
+    (session_dir / "session.json").write_text(json.dumps(session), encoding="utf-8")
+    return _session_status(session_dir, session)
+
+
+@app.post("/upload/sessions")
+async def create_upload_session(
+    project_name: str = Query(...),
+    size: int = Query(..., ge=1),
+    chunk_size: int = Query(UPLOAD_SESSION_CHUNK),
+    overwrite: bool = Query(False),
+    fingerprint: bool = Query(False)
+):
+    if not _is_safe_project_name(project_name):
+        raise HTTPException(status_code=400, detail="Invalid project name")
+
+    if size > UPLOAD_MAX_REQUEST_BYTES:
+        raise HTTPException(status_code=413, detail="Upload too large")
+
+    if (WEB_DIR / project_name).exists() and not overwrite:
+        raise HTTPException(status_code=400, detail="Project already exists (enable overwrite)")
+
+    chunk_size = max(UPLOAD_SESSION_MIN_CHUNK, min(chunk_size, UPLOAD_SESSION_MAX_CHUNK))
+    session = {
+        "id": uuid.uuid4().hex,
+        "project_name": project_name,
+        "size": size,
+        "chunk_size": chunk_size,
+        "chunks": -(-size // chunk_size),
+        "overwrite": overwrite,
+        "fingerprint": fingerprint,
+        "created": time.time(),
+    }
+    return await run_io(_create_session, session)
+
+
+@app.get("/upload/sessions/{upload_id}")
+async def get_upload_session(upload_id: str):
+    session_dir, session = await run_io(_load_session, upload_id)
+    return await run_io(_session_status, session_dir, session)
+
+
+@app.put("/upload/sessions/{upload_id}/chunks/{index}")
+async def put_upload_chunk(upload_id: str, index: int, request: Request):
+    session_dir, session = await run_io(_load_session, upload_id)
+
+    if not 0 <= index < session["chunks"]:
+        raise HTTPException(status_code=400, detail="Chunk index out of range")
+
+    if await run_io((session_dir / "result.json").exists):
+        raise HTTPException(status_code=409, detail="Upload already finalized")
+
+    expected = _chunk_length(session, index)
+    chunk_path = session_dir / f"{index}.chunk"
+    tmp_path = session_dir / f".{index}.{uuid.uuid4().hex}.part"
+    written = 0
+
+    try:
+        out = await run_io(open, tmp_path, "wb")
+        try:
+            async for data in request.stream():
+                written += len(data)
+                if written > expected:
+                    raise HTTPException(status_code=400, detail="Chunk too long")
+                await run_io(out.write, data)
+        finally:
+            await run_io(out.close)
+
+        if written != expected:
+            raise HTTPException(status_code=400, detail=f"Chunk must be {expected} bytes")
+        # A chunk only counts once it is complete
+        await run_io(os.replace, tmp_path, chunk_path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+    return {"status": "ok", "index": index}
+
+
+def _acquire_finalize_lock(lock_path: Path) -> bool:
+    while True:
+        try:
+            os.close(os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return True
+        except FileExistsError:
+            try:
+                if time.time() - lock_path.stat().st_mtime > FINALIZE_LOCK_STALE_SECONDS:
+                    lock_path.unlink(missing_ok=True)
+                    continue
+            except FileNotFoundError:
+                continue
+            return False
+
+
+async def _touch_periodically(path: Path) -> None:
+    while True:
+        await asyncio.sleep(FINALIZE_LOCK_TOUCH_SECONDS)
+        try:
+            await run_io(os.utime, path)
+        except OSError:
+            pass
+
+
+@app.post("/upload/sessions/{upload_id}/finalize")
+async def finalize_upload_session(upload_id: str):
+    session_dir, session = await run_io(_load_session, upload_id)
+
+    # A retried finalize (the first response got lost) gets the same answer
+    result_path = session_dir / "result.json"
+    if await run_io(result_path.exists):
+        return json.loads(await run_io(result_path.read_text, encoding="utf-8"))
+
+    lock_path = session_dir / "finalizing"
+    if not await run_io(_acquire_finalize_lock, lock_path):
+        raise HTTPException(status_code=409, detail="Upload is already being finalized")
+
+    heartbeat = asyncio.ensure_future(_touch_periodically(lock_path))
+    try:
+        # Another finalize may have finished while we waited for the lock
+        if await run_io(result_path.exists):
+            return json.loads(await run_io(result_path.read_text, encoding="utf-8"))
+
+        status = await run_io(_session_status, session_dir, session)
+        if len(status["received"]) != session["chunks"]:
+            raise HTTPException(status_code=409, detail="Upload incomplete")
+
+        project_name = session["project_name"]
+        dest_dir = (WEB_DIR / project_name).resolve()
+        staging_dir = _staging_dir(project_name).resolve()
+        await run_io(staging_dir.mkdir)
+
+        reader = _ChunkFilesReader([session_dir / f"{i}.chunk" for i in range(session["chunks"])])
+        try:
+            saved_files, skipped = await start_extraction(reader, staging_dir, dest_dir)
+        except BaseException:
+            await run_io(shutil.rmtree, staging_dir, ignore_errors=True)
+            raise
+        finally:
+            reader.close()
+
+        has_index = await _publish_upload(
+            project_name, staging_dir, dest_dir, session["overwrite"], session["fingerprint"], saved_files
+        )
+
+        result = {
+            "status": "ok",
+            "project": project_name,
+            "saved_files": len(saved_files),
+            "skipped_files": skipped,
+            "has_index": has_index
+        }
+
+        # Record the answer, then drop the chunks - all before the lock goes,
+        # so a retry sees either this finalize running or its result
+        await run_io(atomic_write_bytes, result_path, json.dumps(result).encode("utf-8"))
+        for i in range(session["chunks"]):
+            await run_io((session_dir / f"{i}.chunk").unlink, missing_ok=True)
+        return result
+    finally:
+        heartbeat.cancel()
+        await run_io(lock_path.unlink, missing_ok=True)
+
+
+@app.delete("/upload/sessions/{upload_id}")
+async def abort_upload_session(upload_id: str):
+    session_dir, _ = await run_io(_load_session, upload_id)
+    await run_io(shutil.rmtree, session_dir, ignore_errors=True)
+    return {"status": "aborted", "upload_id": upload_id}
+
 @app.get("/edit/file")
-def read_file(
+async def read_file(
     project: str = Query(...),
     file: str = Query("index.html")
 ):
-    path = safe_editor_path(project, file)
-    return {"content": path.read_text(encoding="utf-8")}
+    path = await run_io(safe_editor_path, project, file)
+    text, version = await run_io(_read_editor_file, path)
+    # Saves send the version back as If-Match
+    return JSONResponse({"content": text, "version": version}, headers={"ETag": f'"{version}"'})
+
+
+def _editor_text(raw: bytes) -> str:
+    # Same newline handling as read_text(), which the editor has always seen
+    return raw.decode("utf-8").replace("\r\n", "\n").replace("\r", "\n")
+
+
+def _read_editor_file(path: Path) -> tuple[str, str]:
+    raw = path.read_bytes()
+    return _editor_text(raw), hashlib.sha256(raw).hexdigest()
+
+
+def _apply_patch(path: Path, data: FileUpdate) -> bytes:
+    """
+    Apply an editor patch to the file's current text. Any doubt that it is
+    the text the editor patched raises 409, and the editor resends in full.
+    """
+    raw = path.read_bytes()
+    if hashlib.sha256(raw).hexdigest() != data.base_version:
+        raise HTTPException(status_code=409, detail="File changed since it was loaded")
+
+    units = _editor_text(raw).encode("utf-16-le")
+    patch = data.patch
+    if not 0 <= patch.start <= patch.end <= len(units) // 2:
+        raise HTTPException(status_code=409, detail="Patch does not apply")
+
+    try:
+        text = (units[:patch.start * 2] + patch.text.encode("utf-16-le") + units[patch.end * 2:]).decode("utf-16-le")
+    except UnicodeError:
+        raise HTTPException(status_code=409, detail="Patch does not apply")
+
+    if data.length is not None and len(text.encode("utf-16-le")) // 2 != data.length:
+        raise HTTPException(status_code=409, detail="Patch does not apply")
+
+    return text.encode("utf-8")
+
+
+# Saves to the same file are serialized (check version, write, record hash)
+# by one of a fixed set of locks picked by path
+_write_locks = [threading.Lock() for _ in range(64)]
+
+
+def atomic_write_bytes(path: Path, content: bytes) -> None:
+    """
+    Write via a synced temp file renamed over the target, so /web never
+    serves a half-written file, even after a crash.
+    """
+    tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex}.part")
+    try:
+        with open(tmp, "wb") as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        _rename_dir(tmp, path)  # same retry-while-open dance as folders
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+
+def _save_editor_file(path: Path, data: FileUpdate, if_match: str | None) -> bytes:
+    with _write_locks[hash(str(path)) % len(_write_locks)]:
+        if if_match is not None and if_match.strip() != "*":
+            expected = if_match.strip().removeprefix("W/").strip('"')
+            if file_sha256(path) != expected:
+                raise HTTPException(status_code=412, detail="File changed since it was loaded")
+
+        if data.patch is not None and data.base_version:
+            content = _apply_patch(path, data)
+        elif data.content is not None:
+            content = data.content.encode("utf-8")
+        else:
+            raise HTTPException(status_code=400, detail="Send content or a patch")
+
+        atomic_write_bytes(path, content)
+        hot_cache.invalidate(path)
+        remember_sha256(path, path.stat(), hashlib.sha256(content).hexdigest())
+        return content
 
 
 @app.post("/edit/file")
-def write_file(
+async def write_file(
+    request: Request,
     project: str = Query(...),
     file: str = Query("index.html"),
     data: FileUpdate = Body(...)
 ):
-    path = safe_editor_path(project, file)
-    path.write_text(data.content, encoding="utf-8")
-    print("WRITE LENGTH:", len(data.content))
-    print("WRITE PREVIEW:", data.content[:200])
+    path = await run_io(safe_editor_path, project, file)
+    # With If-Match, the save only goes through if nobody else saved since
+    content = await run_io(_save_editor_file, path, data, request.headers.get("if-match"))
+    changed = [file]
+
+    # Keep fingerprinted projects consistent: a saved asset gets a new hashed
+    # name, a saved page gets its references rewritten.
+    project_dir = WEB_DIR / project
+    if path.suffix.lower() in FINGERPRINT_EXTS | {".html"}:
+        previous = (await run_io(read_manifest, project_dir)).get("assets")
+        if previous is not None:
+            logical = {hashed: name for name, hashed in previous.items()}.get(file, file)
+            assets, changed = await run_io(fingerprint_project, project_dir)
+            file = assets.get(logical, file)
+
+    schedule_prepare_assets([project_dir / rel for rel in changed])
+    print("WRITE LENGTH:", len(content))
+    print("WRITE PREVIEW:", content[:200].decode("utf-8", "replace"))
 
     print("[EDITOR WRITE]", path)
     print("WEB_DIR AT RUNTIME:", WEB_DIR)
-    return {"status": "saved"}
+
+    # The version the next patch is based on - unless fingerprinting rewrote
+    # references in the file, so the editor no longer holds what is on disk
+    version = hashlib.sha256(content).hexdigest()
+    if await run_io(file_sha256, project_dir / file) != version:
+        version = None
+    return {"status": "saved", "file": file, "version": version}
 
 
 @app.get("/edit/list")
-def list_files(project: str):
+async def list_files(project: str):
     if not project.replace("-", "").replace("_", "").isalnum():
         raise HTTPException(status_code=400, detail="Invalid project name")
 
+    return {"files": await run_io(_list_editable_files, project)}
+
+
+def _list_editable_files(project: str) -> list[str]:
     project_dir = (WEB_DIR / project).resolve()
 
     if not project_dir.exists():
@@ -404,12 +1911,812 @@ def list_files(project: str):
         if f.is_file() and f.suffix.lower() in ALLOWED_EXTS
     ]
 
-    return {"files": sorted(files)}
+    return sorted(files)
+
+
+# Project file tree for the editor sidebar. Folders are listed one at a time
+# as they are expanded, a page at a time. Each folder's sorted listing is
+# cached against its mtime (adding, removing or renaming a child bumps it),
+# so paging through a huge folder reads it once; sizes and mtimes are only
+# stat'ed for the page being returned.
+
+TREE_PAGE_SIZE = 200
+TREE_PAGE_MAX = 1000
+TREE_CACHE_DIRS = 512
+
+# folder -> (mtime_ns, entries); entries are (is_file, name.lower(), name),
+# which sorts folders first, then case-insensitively, and bisects by cursor
+_tree_cache: OrderedDict[str, tuple[int, list[tuple[bool, str, str]]]] = OrderedDict()
+_tree_lock = threading.Lock()
+
+
+def _dir_listing(directory: Path) -> list[tuple[bool, str, str]]:
+    key = str(directory)
+    mtime = directory.stat().st_mtime_ns
+
+    with _tree_lock:
+        cached = _tree_cache.get(key)
+        if cached is not None and cached[0] == mtime:
+            _tree_cache.move_to_end(key)
+            return cached[1]
+
+    entries = []
+    with os.scandir(directory) as it:
+        for entry in it:
+            # Hidden names are the app's own (.matrix.json, staging folders);
+            # symlinks could point outside the project
+            if entry.name.startswith(".") or entry.is_symlink():
+                continue
+            is_file = not entry.is_dir()
+            entries.append((is_file, entry.name.lower(), entry.name))
+    entries.sort()
+
+    with _tree_lock:
+        _tree_cache[key] = (mtime, entries)
+        _tree_cache.move_to_end(key)
+        while len(_tree_cache) > TREE_CACHE_DIRS:
+            _tree_cache.popitem(last=False)
+
+    return entries
+
+
+def _tree_page(project: str, rel: str, cursor: str | None, limit: int) -> dict:
+    project_dir = (WEB_DIR / project).resolve()
+
+    if not project_dir.exists():
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    if WEB_DIR not in project_dir.parents:
+        raise HTTPException(status_code=400, detail="Invalid project location")
+
+    prefix = _safe_relpath(rel).as_posix() + "/" if rel.strip("/\\") else ""
+    directory = (project_dir / prefix).resolve()
+
+    if directory != project_dir and project_dir not in directory.parents:
+        raise HTTPException(status_code=400, detail="Invalid folder location")
+
+    if not directory.is_dir():
+        raise HTTPException(status_code=404, detail="Folder not found")
+
+    entries = _dir_listing(directory)
+
+    # The cursor is the last entry already sent ("d:<name>" or "f:<name>"),
+    # so pages stay consistent even if the folder changes in between
+    start = 0
+    if cursor:
+        if cursor[:2] not in ("d:", "f:"):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        name = cursor[2:]
+        start = bisect.bisect_right(entries, (cursor[0] == "f", name.lower(), name))
+
+    page = entries[start:start + limit]
+    items = []
+    for is_file, _, name in page:
+        try:
+            st = (directory / name).stat()
+        except FileNotFoundError:
+            continue  # removed since the listing was cached
+
+        item = {"name": name, "path": prefix + name, "type": "file" if is_file else "dir", "mtime": st.st_mtime}
+        if is_file:
+            item["size"] = st.st_size
+            item["editable"] = Path(name).suffix.lower() in ALLOWED_EXTS
+        items.append(item)
+
+    next_cursor = None
+    if start + limit < len(entries):
+        is_file, _, name = page[-1]
+        next_cursor = ("f:" if is_file else "d:") + name
+
+    return {"path": prefix.rstrip("/"), "entries": items, "next_cursor": next_cursor}
+
+
+@app.get("/edit/tree")
+async def file_tree(
+    project: str = Query(...),
+    path: str = Query(""),
+    cursor: str | None = Query(None),
+    limit: int = Query(TREE_PAGE_SIZE, ge=1, le=TREE_PAGE_MAX)
+):
+    if not project.replace("-", "").replace("_", "").isalnum():
+        raise HTTPException(status_code=400, detail="Invalid project name")
+
+    return await run_io(_tree_page, project, path, cursor, limit)
+
+
+# =========================
+# CONTENT HASHES
+# =========================
+# Every served file gets a SHA-256 computed once, when it is written
+# (editor save, upload, scaffold), and memoized on (mtime, size). It backs
+# the strong ETags and the precompressed sibling names below. Files changed
+# outside the app are hashed by a background job on first request.
+
+_file_hashes: dict[str, tuple[int, int, str]] = {}
+
+
+def remember_sha256(path: Path, st: os.stat_result, sha: str) -> None:
+    _file_hashes[str(path)] = (st.st_mtime_ns, st.st_size, sha)
+
+
+def forget_sha256_tree(directory: Path | str) -> None:
+    """Drop the memoized hashes of everything under directory (deleted or replaced)."""
+    prefix = os.path.join(str(directory), "")
+    for path in [p for p in list(_file_hashes) if p.startswith(prefix)]:
+        _file_hashes.pop(path, None)
+
+
+def known_sha256(path: str, st: os.stat_result) -> str | None:
+    """Return the memoized hash if it is still current, without touching disk."""
+    cached = _file_hashes.get(path)
+    if cached and cached[:2] == (st.st_mtime_ns, st.st_size):
+        return cached[2]
+    return None
+
+
+def file_sha256(path: Path, st: os.stat_result | None = None) -> str:
+    """SHA-256 of a file, memoized on (mtime, size)."""
+    st = st or path.stat()
+    sha = known_sha256(str(path), st)
+    if sha is not None:
+        return sha
+
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(UPLOAD_CHUNK_SIZE):
+            h.update(chunk)
+
+    sha = h.hexdigest()
+    remember_sha256(path, st, sha)
+    return sha
+
+
+# =========================
+# PRECOMPRESSED STATIC FILES
+# =========================
+# Text assets get .gz/.br siblings generated in the background whenever they
+# are uploaded or saved. Siblings live in CACHE_DIR keyed by content hash
+# (so identical files share them) and the static mounts serve whichever one
+# the browser accepts. Anything not precompressed yet is gzipped on the fly.
+# Siblings whose content no project has any more are swept along with the
+# blobs, and the folder is kept under a size limit; a known file served
+# without its siblings queues them again, so one removed while still in use
+# is made again on its next request.
+
+COMPRESSED_DIR = CACHE_DIR / "compressed"
+COMPRESSIBLE_EXTS = {".html", ".css", ".js", ".svg", ".json", ".txt", ".map", ".xml"}
+COMPRESS_MIN_BYTES = 512
+COMPRESS_MAX_BYTES = 32 * 1024 * 1024
+COMPRESSED_CACHE_MAX_BYTES = int(os.environ.get("MATRIX_COMPRESSED_CACHE_MAX_BYTES", 1024 ** 3))
+
+# Brotli's top quality takes seconds per MB; bigger files get a quick
+# setting so one large bundle can't hold a job worker (and the deletes
+# queued behind it) for minutes
+BROTLI_MAX_QUALITY_BYTES = 1024 * 1024
+
+
+def _brotli_compress(data: bytes) -> bytes:
+    return brotli.compress(data, quality=11 if len(data) <= BROTLI_MAX_QUALITY_BYTES else 5)
+
+
+PRECOMPRESSED_ENCODINGS = [("gzip", ".gz", lambda data: gzip.compress(data, compresslevel=9, mtime=0))]
+if brotli is not None:
+    PRECOMPRESSED_ENCODINGS.insert(0, ("br", ".br", _brotli_compress))
+
+_prepare_pending: set[str] = set()
+
+# Content that compression doesn't shrink, so it has no siblings to rebuild
+_incompressible: set[str] = set()
+INCOMPRESSIBLE_MEMO_MAX = 10000
+
+
+def _sidecar_path(sha: str, suffix: str) -> Path:
+    return COMPRESSED_DIR / sha[:2] / f"{sha}{suffix}"
+
+
+def _is_compressible(path: Path | str, size: int) -> bool:
+    ext = os.path.splitext(str(path))[1].lower()
+    return ext in COMPRESSIBLE_EXTS and COMPRESS_MIN_BYTES <= size <= COMPRESS_MAX_BYTES
+
+
+def prepare_assets(paths: list[Path]) -> None:
+    """Hash files and write compressed siblings for the text ones."""
+    for path in paths:
+        _prepare_pending.discard(str(path))
+        try:
+            st = path.stat()
+            sha = file_sha256(path, st)
+            if not _is_compressible(path, st.st_size):
+                continue
+
+            data = None
+            have_sidecar = False
+            for _, suffix, compress in PRECOMPRESSED_ENCODINGS:
+                target = _sidecar_path(sha, suffix)
+                if target.exists():
+                    have_sidecar = True
+                    continue
+                if data is None:
+                    data = path.read_bytes()
+                compressed = compress(data)
+                if len(compressed) >= len(data):
+                    continue
+                target.parent.mkdir(parents=True, exist_ok=True)
+                tmp = target.with_name(f"{target.name}.{uuid.uuid4().hex}.part")
+                tmp.write_bytes(compressed)
+                os.replace(tmp, target)
+                have_sidecar = True
+
+            if not have_sidecar:
+                if len(_incompressible) >= INCOMPRESSIBLE_MEMO_MAX:
+                    _incompressible.clear()
+                _incompressible.add(sha)
+        except FileNotFoundError:
+            continue
+
+
+def _live_shas() -> set[str]:
+    """Hashes of the project files hashed since startup (not the blobs')."""
+    blobs_prefix = os.path.join(str(BLOBS_DIR), "")
+    return {entry[2] for path, entry in list(_file_hashes.items()) if not path.startswith(blobs_prefix)}
+
+
+def collect_compressed(orphans: bool = True) -> int:
+    """
+    Remove siblings for content no project has any more (unless orphans is
+    false), then the oldest ones while the folder is over its size limit;
+    returns how many.
+    A sibling is in use if a project file hashed since startup has its
+    content, or a project still links to its blob. Right after a restart
+    few files are hashed yet, so the startup sweep only enforces the size.
+    """
+    if not COMPRESSED_DIR.exists():
+        return 0
+
+    cutoff = time.time() - BLOB_GC_GRACE_SECONDS
+    live = _live_shas() if orphans else set()
+    removed = 0
+    kept = []
+    for shard in COMPRESSED_DIR.iterdir():
+        if not shard.is_dir():
+            continue
+        for sidecar in shard.iterdir():
+            try:
+                st = sidecar.stat()
+                if orphans and st.st_mtime < cutoff and not sidecar.name.endswith(".part"):
+                    sha = sidecar.name.split(".", 1)[0]
+                    in_use = sha in live
+                    if not in_use and BLOB_DEDUP:
+                        try:
+                            in_use = _blob_path(sha).stat().st_nlink > 1
+                        except FileNotFoundError:
+                            pass
+                    if not in_use:
+                        sidecar.unlink()
+                        removed += 1
+                        continue
+                kept.append((st.st_mtime, st.st_size, sidecar))
+            except OSError:
+                pass
+
+    total = sum(size for _, size, _ in kept)
+    kept.sort()
+    for mtime, size, sidecar in kept:
+        if total <= COMPRESSED_CACHE_MAX_BYTES:
+            break
+        if mtime >= cutoff:
+            continue
+        try:
+            sidecar.unlink()
+            removed += 1
+            total -= size
+        except OSError:
+            pass
+    return removed
+
+
+def schedule_prepare_assets(paths: list[Path]) -> None:
+    todo = []
+    for p in paths:
+        if str(p) not in _prepare_pending:
+            _prepare_pending.add(str(p))
+            todo.append(Path(p))
+    if todo:
+        submit_job("prepare-assets", prepare_assets, todo)
+
+
+def _accepted_encodings(header: str) -> set[str]:
+    accepted = set()
+    for part in header.split(","):
+        name, _, params = part.partition(";")
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                if float(params[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        if name.strip():
+            accepted.add(name.strip().lower())
+    return accepted
+
+
+# =========================
+# CACHE POLICY
+# =========================
+# Cache-Control is picked per file from a policy: exact file match first,
+# then "hashed" for fingerprinted names, then by extension, then the default.
+# A name counts as fingerprinted if the manifest's "assets" map lists it, or
+# if its name.<hex>.ext part is a prefix of the file's own SHA-256 - a
+# date-stamped bundle.20240101.js is not. Projects can override any of it in a manifest at
+# /web/<project>/.matrix.json:
+#
+#   {"cache": {"default": "public, max-age=600",
+#              "extensions": {".css": "public, max-age=86400"},
+#              "files": {"about.html": "no-store"},
+#              "hashed": "public, max-age=31536000, immutable"}}
+
+PROJECT_MANIFEST = ".matrix.json"
+MANIFEST_RECHECK_SECONDS = 2.0
+HASHED_NAME_RE = re.compile(r"\.([0-9a-f]{8,})\.[A-Za-z0-9]+$")
+
+DEFAULT_CACHE_POLICY = {
+    "default": "public, max-age=300",
+    "extensions": {".html": "no-cache"},
+    "files": {},
+    "hashed": "public, max-age=31536000, immutable",
+    "hashed_files": frozenset(),
+}
+
+HACK_CACHE_POLICY = {
+    **DEFAULT_CACHE_POLICY,
+    "default": "public, max-age=600",
+}
+
+# project -> (checked at, manifest mtime, merged policy)
+_policy_cache: dict[str, tuple[float, int | None, dict]] = {}
+
+
+def _merge_policy(base: dict, override: dict) -> dict:
+    merged = dict(base)
+    for key in ("default", "hashed"):
+        if isinstance(override.get(key), str):
+            merged[key] = override[key]
+    for key in ("extensions", "files"):
+        if isinstance(override.get(key), dict):
+            merged[key] = {**base[key], **override[key]}
+    return merged
+
+
+def read_manifest(project_dir: Path) -> dict:
+    path = project_dir / PROJECT_MANIFEST
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as exc:
+        print("[MANIFEST]", path, exc)
+        return {}
+
+
+def write_manifest(project_dir: Path, manifest: dict) -> None:
+    # Replaced, not edited: an uploaded manifest may be a shared blob
+    atomic_write_bytes(project_dir / PROJECT_MANIFEST, json.dumps(manifest, indent=2).encode("utf-8"))
+    forget_cache_policy(project_dir.name)
+
+
+def project_cache_policy(project: str) -> dict:
+    now = time.monotonic()
+    cached = _policy_cache.get(project)
+    if cached and now - cached[0] < MANIFEST_RECHECK_SECONDS:
+        return cached[2]
+
+    try:
+        mtime = (WEB_DIR / project / PROJECT_MANIFEST).stat().st_mtime_ns
+    except OSError:
+        mtime = None
+
+    if cached and cached[1] == mtime:
+        policy = cached[2]
+    elif mtime is None:
+        policy = DEFAULT_CACHE_POLICY
+    else:
+        manifest = read_manifest(WEB_DIR / project)
+        policy = _merge_policy(DEFAULT_CACHE_POLICY, manifest.get("cache") or {})
+        assets = manifest.get("assets")
+        if isinstance(assets, dict):
+            policy["hashed_files"] = frozenset(v for v in assets.values() if isinstance(v, str))
+
+    _policy_cache[project] = (now, mtime, policy)
+    return policy
+
+
+def forget_cache_policy(project: str) -> None:
+    _policy_cache.pop(project, None)
+
+
+def is_hashed_name(name: str, sha: str | None) -> bool:
+    """Whether name embeds (a prefix of) sha, the hash of its own content."""
+    m = HASHED_NAME_RE.search(name)
+    return m is not None and sha is not None and sha.startswith(m.group(1))
+
+
+def cache_control_for(policy: dict, rel_path: str, sha: str | None = None) -> str:
+    if rel_path in policy["files"]:
+        return policy["files"][rel_path]
+    name = rel_path.rsplit("/", 1)[-1]
+    if rel_path in policy["hashed_files"] or is_hashed_name(name, sha):
+        return policy["hashed"]
+    ext = os.path.splitext(name)[1].lower()
+    return policy["extensions"].get(ext, policy["default"])
+
+
+# =========================
+# ASSET FINGERPRINTING
+# =========================
+# Optional build step: rename the CSS/JS the HTML links to (src/href) to
+# name.<hash>.ext, point the HTML at the new names and record the mapping under "assets" in the manifest, e.g.
+# {"assets": {"style.css": "style.3f9c2b1a0d.css"}}. Names in that map are
+# served as immutable by the cache policy.
+# Once a project has an "assets" map, editor saves re-run the step.
+
+FINGERPRINT_EXTS = {".css", ".js"}
+FINGERPRINT_HASH_LEN = 10
+_REF_RE = re.compile(r"""(\b(?:src|href)\s*=\s*)(["'])([^"']*)\2""", re.IGNORECASE)
+_EXTERNAL_URL_PREFIXES = ("http:", "https:", "//", "data:", "#", "mailto:", "javascript:")
+
+
+def _fingerprinted_name(rel: str, sha: str) -> str:
+    p = PurePosixPath(rel)
+    return str(p.with_name(f"{p.stem}.{sha[:FINGERPRINT_HASH_LEN]}{p.suffix}"))
+
+
+def _split_ref(url: str) -> tuple[str, str]:
+    """Split a src/href value into its path and its ?query/#fragment."""
+    cut = min((i for i in (url.find("?"), url.find("#")) if i != -1), default=len(url))
+    return url[:cut], url[cut:]
+
+
+def _ref_target(path_part: str, html_dir: str, url_prefix: str) -> str | None:
+    """The project-relative path a reference points at, or None if it leaves the project."""
+    if not path_part or path_part.startswith(_EXTERNAL_URL_PREFIXES):
+        return None
+    if path_part.startswith(url_prefix):
+        return path_part[len(url_prefix):]
+    if path_part.startswith("/"):
+        return None
+    return posixpath.normpath(posixpath.join(html_dir, path_part))
+
+
+def _referenced_paths(html: str, html_dir: str, url_prefix: str) -> set[str]:
+    refs = set()
+    for m in _REF_RE.finditer(html):
+        target = _ref_target(_split_ref(m.group(3))[0], html_dir, url_prefix)
+        if target is not None:
+            refs.add(target)
+    return refs
+
+
+def _rewrite_refs(html: str, html_dir: str, url_prefix: str, renames: dict[str, str]) -> str:
+    """Point src/href attributes that resolve to a renamed asset at its new name."""
+
+    def swap(m: re.Match) -> str:
+        path_part, rest = _split_ref(m.group(3))
+        target = _ref_target(path_part, html_dir, url_prefix)
+        if target is None:
+            return m.group(0)
+
+        new = renames.get(target)
+        if new is None or new == target:
+            return m.group(0)
+
+        # Assets are only ever renamed within their folder, so swap the basename
+        new_url = path_part[:len(path_part) - len(posixpath.basename(path_part))] + posixpath.basename(new)
+        return f"{m.group(1)}{m.group(2)}{new_url}{rest}{m.group(2)}"
+
+    return _REF_RE.sub(swap, html)
+
+
+def fingerprint_project(project_dir: Path, url_name: str | None = None) -> tuple[dict[str, str], list[str]]:
+    """
+    Fingerprint the CSS/JS in project_dir and rewrite references in its HTML.
+    Only assets some HTML page links to directly are renamed: anything else
+    may be loaded by a name written in JS or CSS (imports, @import, chunks)
+    that this step can't rewrite.
+    url_name is the project name used in absolute /web/<name>/ URLs (defaults
+    to the folder name; differs while an upload is still staged).
+    Returns the asset map and the relative paths of files that changed.
+    """
+    url_prefix = f"/web/{url_name or project_dir.name}/"
+    manifest = read_manifest(project_dir)
+    assets = dict(manifest.get("assets") or {})
+    logical_of = {hashed: logical for logical, hashed in assets.items()}
+    renames: dict[str, str] = {}
+    changed: list[str] = []
+
+    pages: list[tuple[Path, str, str]] = []
+    referenced: set[str] = set()
+    for html_path in sorted(project_dir.rglob("*.html")):
+        rel = html_path.relative_to(project_dir).as_posix()
+        if any(part.startswith(".") for part in rel.split("/")):
+            continue
+        try:
+            text = html_path.read_bytes().decode("utf-8")
+        except UnicodeDecodeError:
+            continue
+        pages.append((html_path, rel, text))
+        referenced |= _referenced_paths(text, posixpath.dirname(rel), url_prefix)
+
+    for path in sorted(project_dir.rglob("*")):
+        rel = path.relative_to(project_dir).as_posix()
+        if path.suffix.lower() not in FINGERPRINT_EXTS or any(part.startswith(".") for part in rel.split("/")):
+            continue
+        if not path.is_file():
+            continue
+
+        logical = logical_of.get(rel)
+        if logical is None:
+            if rel not in referenced:
+                continue
+            if is_hashed_name(path.name, file_sha256(path)):
+                continue  # already fingerprinted by the project's own build
+            logical = rel
+
+        sha = file_sha256(path)
+        new_rel = _fingerprinted_name(logical, sha)
+        if new_rel != rel:
+            new_path = project_dir / new_rel
+            os.replace(path, new_path)
+            remember_sha256(new_path, new_path.stat(), sha)
+            changed.append(new_rel)
+
+        renames[rel] = new_rel
+        renames[logical] = new_rel
+        assets[logical] = new_rel
+
+    # Old hashed names still referenced from HTML point at the current ones
+    for hashed, logical in logical_of.items():
+        if logical in assets:
+            renames.setdefault(hashed, assets[logical])
+    assets = {logical: hashed for logical, hashed in assets.items() if (project_dir / hashed).exists()}
+
+    for html_path, rel, text in pages:
+        new_text = _rewrite_refs(text, posixpath.dirname(rel), url_prefix, renames)
+        if new_text != text:
+            content = new_text.encode("utf-8")
+            atomic_write_bytes(html_path, content)
+            remember_sha256(html_path, html_path.stat(), hashlib.sha256(content).hexdigest())
+            changed.append(rel)
+
+    manifest["assets"] = assets
+    write_manifest(project_dir, manifest)
+    return assets, changed
+
+
+@app.post("/projects/{project_name}/fingerprint")
+async def fingerprint_project_assets(project_name: str):
+    if not _is_safe_project_name(project_name):
+        raise HTTPException(status_code=400, detail="Invalid project name")
+
+    project_dir = WEB_DIR / project_name
+    if not await run_io(project_dir.is_dir):
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    assets, changed = await run_io(fingerprint_project, project_dir)
+    schedule_prepare_assets([project_dir / rel for rel in changed])
+
+    return {"status": "fingerprinted", "project": project_name, "assets": assets}
+
+
+# =========================
+# HOT FILE CACHE
+# =========================
+# Small files that keep getting requested are served from RAM. Entries are
+# validated against (mtime, size) on every hit and dropped explicitly when
+# the app writes a file, so a save is visible immediately. A file is only
+# loaded on its second miss (the first is just remembered, in a bounded
+# list of recent paths), which keeps one-off hits from pushing out hot pages.
+
+HOT_CACHE_MAX_BYTES = int(os.environ.get("MATRIX_HOT_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+HOT_FILE_MAX_BYTES = int(os.environ.get("MATRIX_HOT_FILE_MAX_BYTES", 256 * 1024))
+HOT_SEEN_MAX = 4096
+
+
+class HotFileCache:
+    """Bytes-bounded LRU of file contents keyed by path, checked by mtime+size."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.entries: OrderedDict[str, tuple[int, int, bytes]] = OrderedDict()
+        self.seen: OrderedDict[str, None] = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def get(self, path: str, st: os.stat_result) -> bytes | None:
+        with self.lock:
+            entry = self.entries.get(path)
+            if entry is not None and entry[:2] == (st.st_mtime_ns, st.st_size):
+                self.entries.move_to_end(path)
+                self.hits += 1
+                return entry[2]
+            self.misses += 1
+            return None
+
+    def admit(self, path: str) -> bool:
+        """Whether a missed path has missed before and should be loaded now."""
+        with self.lock:
+            if path in self.seen:
+                del self.seen[path]
+                return True
+            self.seen[path] = None
+            if len(self.seen) > HOT_SEEN_MAX:
+                self.seen.popitem(last=False)
+            return False
+
+    def load(self, path: str, st: os.stat_result) -> None:
+        try:
+            with open(path, "rb") as f:
+                data = f.read(st.st_size + 1)
+        except OSError:
+            return
+        if len(data) != st.st_size:
+            return  # changed while reading; the next hit retries
+
+        with self.lock:
+            self._discard(path)
+            self.entries[path] = (st.st_mtime_ns, st.st_size, data)
+            self.size += len(data)
+            while self.size > self.max_bytes:
+                _, (_, _, old) = self.entries.popitem(last=False)
+                self.size -= len(old)
+                self.evictions += 1
+
+    def _discard(self, path: str) -> None:
+        entry = self.entries.pop(path, None)
+        if entry is not None:
+            self.size -= len(entry[2])
+
+    def invalidate(self, path: Path | str) -> None:
+        with self.lock:
+            self._discard(str(path))
+
+    def invalidate_tree(self, directory: Path | str) -> None:
+        prefix = os.path.join(str(directory), "")
+        with self.lock:
+            for path in [p for p in self.entries if p.startswith(prefix)]:
+                self._discard(path)
+
+    def stats(self) -> dict:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "bytes": self.size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+hot_cache = HotFileCache(HOT_CACHE_MAX_BYTES)
+_hot_loading: set[str] = set()
+
+
+def _load_hot_file(path: str, st: os.stat_result) -> None:
+    try:
+        hot_cache.load(path, st)
+    finally:
+        _hot_loading.discard(path)
+
+
+@app.get("/cache/stats")
+def cache_stats():
+    return hot_cache.stats()
+
+
+# =========================
+# STATIC ASSET SERVING
+# =========================
+
+class CachedStaticFiles(StaticFiles):
+    """
+    StaticFiles with content-hash ETags, a Cache-Control policy and
+    precompressed .br/.gz siblings. With per_project=True the first path
+    segment is a project whose manifest can override the policy.
+    """
+
+    def __init__(self, *args, cache_policy: dict = DEFAULT_CACHE_POLICY, per_project: bool = False, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cache_policy = cache_policy
+        self.per_project = per_project
+
+    def cache_control(self, full_path, sha: str | None = None) -> str:
+        rel_path = os.path.relpath(full_path, self.directory).replace(os.sep, "/")
+        if not self.per_project:
+            return cache_control_for(self.cache_policy, rel_path, sha)
+        project, _, rel_path = rel_path.partition("/")
+        return cache_control_for(project_cache_policy(project), rel_path, sha)
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        request_headers = Headers(scope=scope)
+        sha = known_sha256(str(full_path), stat_result)
+        compressible = _is_compressible(full_path, stat_result.st_size)
+        accepted = _accepted_encodings(request_headers.get("accept-encoding", "")) if compressible else set()
+
+        if sha is None:
+            # Changed outside the app, or first hit since startup
+            schedule_prepare_assets([Path(full_path)])
+
+        response = None
+        if sha is not None and accepted:
+            for encoding, suffix, _ in PRECOMPRESSED_ENCODINGS:
+                if encoding not in accepted:
+                    continue
+                sidecar = _sidecar_path(sha, suffix)
+                try:
+                    sidecar_stat = os.stat(sidecar)
+                except FileNotFoundError:
+                    continue
+                response = FileResponse(
+                    sidecar,
+                    status_code=status_code,
+                    stat_result=sidecar_stat,
+                    media_type=mimetypes.guess_type(str(full_path))[0] or "text/plain",
+                    headers={"Content-Encoding": encoding},
+                )
+                response.headers["ETag"] = f'"{sha[:32]}-{encoding}"'
+                served_path, served_stat = str(sidecar), sidecar_stat
+                break
+            else:
+                if sha not in _incompressible:
+                    # Siblings were collected (or never made): queue them again
+                    schedule_prepare_assets([Path(full_path)])
+
+        if response is None:
+            served_path, served_stat = str(full_path), stat_result
+            response = FileResponse(full_path, status_code=status_code, stat_result=stat_result)
+            if sha is not None:
+                response.headers["ETag"] = f'"{sha[:32]}"'
+
+        response.headers["Last-Modified"] = formatdate(stat_result.st_mtime, usegmt=True)
+        response.headers["Cache-Control"] = self.cache_control(full_path, sha)
+        if compressible:
+            response.headers["Vary"] = "Accept-Encoding"
+
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+
+        if (
+            scope["method"] == "GET"
+            and served_stat.st_size <= HOT_FILE_MAX_BYTES
+            and "range" not in request_headers
+        ):
+            body = hot_cache.get(served_path, served_stat)
+            if body is not None:
+                response = Response(body, status_code=status_code, headers=response.headers)
+            elif served_path not in _hot_loading and hot_cache.admit(served_path):
+                _hot_loading.add(served_path)
+                io_executor.submit(_load_hot_file, served_path, served_stat)
+
+        if "gzip" in accepted and "content-encoding" not in response.headers:
+            # On-the-fly fallback: the gzipped bytes aren't the identity
+            # representation, so the ETag can only be weak.
+            response.headers["ETag"] = "W/" + response.headers["etag"].removeprefix("W/")
+            return GZipResponder(response, COMPRESS_MIN_BYTES, compresslevel=6)
+
+        return response
 
 
 # =========================
 # STATIC FILE SERVERS (LAST)
 # =========================
 
-app.mount("/hack", StaticFiles(directory=HACK_DIR), name="hack")
-app.mount("/web", StaticFiles(directory=WEB_DIR, html=True), name="web")
\ No newline at end of file
+app.mount("/hack", CachedStaticFiles(directory=HACK_DIR, cache_policy=HACK_CACHE_POLICY), name="hack")
+app.mount("/web", CachedStaticFiles(directory=WEB_DIR, html=True, per_project=True), name="web")
+
+STARTUP_REPORT["import_ms"] = round((time.perf_counter() - _STARTED) * 1000, 1)
@@ -11,6 +11,13 @@ rmdir /s /q dist 2>nul
 rmdir /s /q build 2>nul
 del launcher.spec 2>nul
 
+echo.
+echo Precompiling bytecode...
+REM Embedded runtime packages never change: skip source checks at import time.
+REM app.py / matrix.py keep hash checks so local edits still take effect.
+python\python.exe -m compileall -q -j 0 --invalidation-mode unchecked-hash python
+python\python.exe -m compileall -q --invalidation-mode checked-hash app.py matrix.py
+
 echo.
 echo Running PyInstaller...
 echo.
@@ -22,6 +29,7 @@ python -m PyInstaller launcher.py ^
   --add-data "app.py;." ^
   --add-data "matrix.py;." ^
   --add-data "hack;hack" ^
+  --add-data "templates;templates" ^
   --add-data "web;web"
 
 echo.
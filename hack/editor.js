@@ -9,6 +9,11 @@ const project = qs("project");
 const file = "index.html";
 document.getElementById("projectName").textContent = project || "???";
 const statusEl = document.getElementById("status");
+
+// What the server last confirmed is on disk: saves send only the changed
+// range against this version
+let baseText = null;
+let baseVersion = null;
 const cm = CodeMirror.fromTextArea(
     document.getElementById("editor"),
     {
@@ -20,22 +25,100 @@ const cm = CodeMirror.fromTextArea(
 
 async function loadFile() {
     setMode(currentFile);
-    const res = await fetch(`/edit/file?project=${project}&file=${currentFile}`);
+    const res = await fetch(`/edit/file?project=${encodeURIComponent(project)}&file=${encodeURIComponent(currentFile)}`);
     const data = await res.json();
     cm.setValue(data.content || "");
+    baseText = data.content || "";
+    baseVersion = data.version || null;
     preview.src = `/web/${project}/index.html?t=${Date.now()}`;
 
 }
 
-async function saveFile() {
-    console.log("EDITOR SAVE LENGTH:", cm.getValue().length);
-    console.log("EDITOR SAVE PREVIEW:", cm.getValue().slice(0, 200));
+// Smallest single replacement turning a into b (common prefix/suffix),
+// never splitting a surrogate pair
+function diffRange(a, b) {
+    const max = Math.min(a.length, b.length);
+    let start = 0;
+    while (start < max && a.charCodeAt(start) === b.charCodeAt(start)) start++;
+    if (start > 0 && isHighSurrogate(a.charCodeAt(start - 1))) start--;
+
+    let endA = a.length;
+    let endB = b.length;
+    while (endA > start && endB > start && a.charCodeAt(endA - 1) === b.charCodeAt(endB - 1)) {
+        endA--;
+        endB--;
+    }
+    if (endA < a.length && isLowSurrogate(a.charCodeAt(endA))) {
+        endA++;
+        endB++;
+    }
+
+    return { start, end: endA, text: b.slice(start, endB) };
+}
 
-    await fetch(`/edit/file?project=${project}&file=${currentFile}`, {
+function isHighSurrogate(code) {
+    return code >= 0xd800 && code <= 0xdbff;
+}
+
+function isLowSurrogate(code) {
+    return code >= 0xdc00 && code <= 0xdfff;
+}
+
+function postFile(body, force = false) {
+    const headers = {"Content-Type": "application/json"};
+    // Refuse to overwrite someone else's save (another tab, another editor)
+    if (baseVersion !== null && !force) headers["If-Match"] = `"${baseVersion}"`;
+
+    return fetch(`/edit/file?project=${encodeURIComponent(project)}&file=${encodeURIComponent(currentFile)}`, {
         method: "POST",
-        headers: {"Content-Type": "application/json"},
-        body: JSON.stringify({ content: cm.getValue() })
+        headers,
+        body: JSON.stringify(body)
     });
+}
+
+async function saveFile() {
+    const text = cm.getValue();
+    console.log("EDITOR SAVE LENGTH:", text.length);
+    console.log("EDITOR SAVE PREVIEW:", text.slice(0, 200));
+
+    let res;
+    if (baseVersion !== null) {
+        res = await postFile({
+            base_version: baseVersion,
+            patch: diffRange(baseText, text),
+            length: text.length
+        });
+    }
+
+    // No known version, or the file changed under us: send everything
+    if (!res || res.status === 409) {
+        res = await postFile({ content: text });
+    }
+    if (res.status === 412) {
+        if (!confirm(`${currentFile} was changed since you opened it. Overwrite it?`)) {
+            statusEl.textContent = "NOT SAVED: file changed elsewhere";
+            return;
+        }
+        res = await postFile({ content: text }, true);
+    }
+    const data = await res.json();
+
+    if (res.ok) {
+        baseText = text;
+        baseVersion = data.version || null;
+        statusEl.textContent = "";
+    } else {
+        statusEl.textContent = `SAVE FAILED: ${data.detail || res.status}`;
+    }
+
+    // Fingerprinted assets get a new hashed name on every save, and pages get
+    // their references rewritten: reload to pick those up
+    if (data.file && data.file !== currentFile) {
+        currentFile = data.file;
+        loadFileList();
+        loadFile();
+    }
+
     preview.src = "about:blank";
     setTimeout(() => {
         preview.src = `/web/${project}/index.html?t=${Date.now()}`;
@@ -43,30 +126,88 @@ async function saveFile() {
 
 }
 
-async function loadFileList() {
-    const res = await fetch(`/edit/list?project=${encodeURIComponent(project)}`);
-    const data = await res.json();
+// The sidebar is a lazily expanded tree: each folder is fetched from
+// /edit/tree the first time it is opened, a page at a time.
+const TREE_PAGE = 200;
 
-    sidebar.innerHTML = "";
+function treeRow(label, depth) {
+    const el = document.createElement("div");
+    el.textContent = label;
+    el.style.padding = "6px";
+    el.style.paddingLeft = `${6 + depth * 12}px`;
+    el.style.cursor = "pointer";
+    el.style.whiteSpace = "nowrap";
+    return el;
+}
+
+function treeNode(entry, depth) {
+    if (entry.type === "dir") {
+        const node = document.createElement("div");
+        const row = treeRow(`▸ ${entry.name}/`, depth);
+        const children = document.createElement("div");
+        let loaded = false;
+
+        row.onclick = () => {
+            const open = loaded && children.style.display !== "none";
+            if (!loaded) {
+                loaded = true;
+                loadTreePage(children, entry.path, null, depth + 1);
+            } else {
+                children.style.display = open ? "none" : "";
+            }
+            row.textContent = `${open ? "▸" : "▾"} ${entry.name}/`;
+        };
+
+        node.append(row, children);
+        return node;
+    }
+
+    const row = treeRow(entry.name, depth);
+    row.title = `${entry.size} bytes, modified ${new Date(entry.mtime * 1000).toLocaleString()}`;
+    if (entry.editable) {
+        row.onclick = () => {
+            currentFile = entry.path;
+            loadFile();
+        };
+    } else {
+        row.style.opacity = "0.5";
+        row.style.cursor = "default";
+    }
+    return row;
+}
+
+async function loadTreePage(container, path, cursor, depth) {
+    const params = new URLSearchParams({ project, path, limit: TREE_PAGE });
+    if (cursor) params.set("cursor", cursor);
+
+    const res = await fetch(`/edit/tree?${params}`);
+    const data = await res.json();
 
-    if (!res.ok || !data.files) {
+    if (!res.ok || !data.entries) {
         const msg = data.detail || "Failed to load file list";
-        sidebar.textContent = msg;
+        container.appendChild(treeRow(msg, depth));
         console.error("File list error:", data);
         return;
     }
 
-    data.files.forEach(f => {
-        const el = document.createElement("div");
-        el.textContent = f;
-        el.style.padding = "6px";
-        el.style.cursor = "pointer";
-        el.onclick = () => {
-            currentFile = f;
-            loadFile();
+    const frag = document.createDocumentFragment();
+    data.entries.forEach(entry => frag.appendChild(treeNode(entry, depth)));
+
+    if (data.next_cursor) {
+        const more = treeRow("… more", depth);
+        more.onclick = () => {
+            more.remove();
+            loadTreePage(container, path, data.next_cursor, depth);
         };
-        sidebar.appendChild(el);
-    });
+        frag.appendChild(more);
+    }
+
+    container.appendChild(frag);
+}
+
+async function loadFileList() {
+    sidebar.innerHTML = "";
+    await loadTreePage(sidebar, "", null, 0);
 }
 
 
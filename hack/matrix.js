@@ -3,11 +3,60 @@ let pendingDelete = null;
 const terminal = document.getElementById("terminal");
 const input = document.getElementById("command");
 
+// Terminal output is a fixed-capacity ring of line nodes: once it is full
+// the oldest node is recycled for the newest line, so the DOM never holds
+// more than TERMINAL_LINES lines. Lines printed in the same frame are
+// batched and written in one requestAnimationFrame pass.
+const TERMINAL_LINES = 1000;
+
+let pendingLines = [];
+let flushScheduled = false;
+
 function print(line = "") {
-    terminal.innerText += line + "\n";
+    pendingLines.push(String(line));
+
+    // Anything beyond one screenful of capacity would be recycled anyway
+    if (pendingLines.length > TERMINAL_LINES * 2) {
+        pendingLines = pendingLines.slice(-TERMINAL_LINES);
+    }
+
+    if (!flushScheduled) {
+        flushScheduled = true;
+        requestAnimationFrame(flushTerminal);
+    }
+}
+
+function flushTerminal() {
+    flushScheduled = false;
+
+    const lines = pendingLines.slice(-TERMINAL_LINES);
+    pendingLines = [];
+
+    const fragment = document.createDocumentFragment();
+    let count = terminal.childElementCount;
+
+    for (const line of lines) {
+        let node;
+        if (count >= TERMINAL_LINES && terminal.firstChild) {
+            node = terminal.removeChild(terminal.firstChild);
+        } else {
+            node = document.createElement("div");
+            count++;
+        }
+        // A lone space keeps empty lines at full height under pre-wrap
+        node.textContent = line || " ";
+        fragment.appendChild(node);
+    }
+
+    terminal.appendChild(fragment);
     terminal.scrollTop = terminal.scrollHeight;
 }
 
+function clearTerminal() {
+    pendingLines = [];
+    terminal.textContent = "";
+}
+
 print("SERVER STATUS: RUNNING");
 print("Welcome to your terminal.");
 print("Type 'help' for list of commands.");
@@ -33,9 +82,11 @@ function runCommand() {
         print("  ls                 list projects");
         print("  open <name>        open a project");
         print("  edit <name>        edit project html");
-        print("  new <name>         create a new project");
+        print("  new <name> [kit]   create a new project (kits: templates)");
+        print("  templates          list starter kits");
         print("  upload             upload a folder as a web project");
         print("  delete <name>      delete a project");
+        print("  export <name>      download a project as .zip");
         print("  clear              clear screen");
         print("  hack               ----");
         return;
@@ -43,7 +94,7 @@ function runCommand() {
 
     // ---- CLEAR ----
     if (cmd === "clear") {
-        terminal.innerText = "";
+        clearTerminal();
         return;
     }
 
@@ -72,15 +123,16 @@ function runCommand() {
 
     // ---- NEW PROJECT ----
     if (cmd.startsWith("new ")) {
-        const name = cmd.split(" ")[1];
+        const [, name, kit] = cmd.split(" ");
+        const query = kit ? `?template=${encodeURIComponent(kit)}` : "";
 
-        fetch(`/projects/new/${name}`, { method: "POST" })
+        fetch(`/projects/new/${name}${query}`, { method: "POST" })
             .then(r => r.json())
             .then(data => {
-                if (data.error) {
-                    print(`ERROR: ${data.error}`);
+                if (data.error || data.detail) {
+                    print(`ERROR: ${data.error || data.detail}`);
                 } else {
-                    print(`Project '${name}' created.`);
+                    print(`Project '${name}' created from '${data.template}'.`);
                     print("Type 'ls' to see it.");
                 }
             });
@@ -88,6 +140,24 @@ function runCommand() {
         return;
     }
 
+    // ---- LIST TEMPLATES ----
+    if (cmd === "templates") {
+        fetch("/templates")
+            .then(r => r.json())
+            .then(data => {
+                data.templates.forEach(t => print(t === data.default ? `${t} (default)` : t));
+            });
+        return;
+    }
+
+    // ---- EXPORT PROJECT ----
+    if (cmd.startsWith("export ")) {
+        const name = cmd.split(" ")[1];
+        print(`Exporting '${name}'...`);
+        window.location.href = `/projects/${encodeURIComponent(name)}/export`;
+        return;
+    }
+
     // ---- UPLOAD PROJECT ----
     if (cmd === "upload") {
         print("Opening upload interface...");
@@ -181,31 +251,155 @@ function runHack() {
     runCommand();
 }
 
-let matrixInterval = null;
+// ---- Matrix rain (canvas) ----
+// The rain is drawn on a canvas laid over the terminal and driven by
+// requestAnimationFrame, so it never touches the terminal's DOM or layout.
+// Glyphs come from the server's /hack/stream when it is reachable (one
+// stream row feeds one glyph per column), otherwise they are random.
+// Each frame is timed against RAIN_FRAME_BUDGET_MS; when drawing gets too
+// slow the backing resolution drops (and recovers when there is headroom).
+// After a resize the average restarts from a neutral value and the next
+// resize waits RAIN_RESIZE_COOLDOWN_FRAMES, so quality settles instead of
+// flapping (every resize clears the canvas).
+const RAIN_GLYPHS = "アカサタナハマヤラワ0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ#$%";
+const RAIN_FONT_PX = 16;
+const RAIN_FRAME_BUDGET_MS = 1000 / 60;
+const RAIN_MIN_QUALITY = 0.35;
+const RAIN_RESIZE_COOLDOWN_FRAMES = 30;
+
+let rain = null;
 
 function startTerminalMatrix(duration = 4000) {
-    const chars = "アカサタナハマヤラワ0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ#$%";
-    const startTime = Date.now();
+    if (rain) stopRain();
 
-    matrixInterval = setInterval(() => {
-        let line = "";
-        const lineLength = Math.floor(Math.random() * 40) + 40;
+    const canvas = document.createElement("canvas");
+    const ctx = canvas.getContext("2d", { desynchronized: true });
+    if (!ctx) {
+        setTimeout(stopTerminalMatrix, duration);
+        return;
+    }
 
-        for (let i = 0; i < lineLength; i++) {
-            line += chars[Math.floor(Math.random() * chars.length)];
-        }
+    const rect = terminal.getBoundingClientRect();
+    Object.assign(canvas.style, {
+        position: "fixed",
+        left: rect.left + "px",
+        top: rect.top + "px",
+        width: rect.width + "px",
+        height: rect.height + "px",
+        pointerEvents: "none"
+    });
+    document.body.appendChild(canvas);
+
+    const columns = Math.max(1, Math.floor(rect.width / RAIN_FONT_PX));
+
+    rain = {
+        canvas,
+        ctx,
+        rect,
+        columns,
+        drops: new Float32Array(columns).map(() => Math.random() * -rect.height / RAIN_FONT_PX),
+        quality: 1,
+        avgCost: 0,
+        sinceResize: 0,
+        rows: [],
+        source: null,
+        frame: 0,
+        endsAt: performance.now() + duration
+    };
+
+    resizeRain(1);
+
+    if (window.EventSource) {
+        rain.source = new EventSource("/hack/stream");
+        rain.source.onmessage = (e) => {
+            if (rain && rain.rows.length < 8) rain.rows.push(e.data);
+        };
+        rain.source.onerror = () => {
+            if (!rain || !rain.source) return;
+            rain.source.close();
+            rain.source = null;
+        };
+    }
+
+    rain.frame = requestAnimationFrame(drawRain);
+}
+
+function resizeRain(quality) {
+    const dpr = window.devicePixelRatio || 1;
+    rain.quality = quality;
+    rain.canvas.width = Math.max(1, Math.floor(rain.rect.width * dpr * quality));
+    rain.canvas.height = Math.max(1, Math.floor(rain.rect.height * dpr * quality));
+
+    // Draw in CSS pixels whatever the backing resolution
+    const scale = dpr * quality;
+    rain.ctx.setTransform(scale, 0, 0, scale, 0, 0);
+    rain.ctx.font = `${RAIN_FONT_PX}px monospace`;
+    rain.ctx.fillStyle = "#000";
+    rain.ctx.fillRect(0, 0, rain.rect.width, rain.rect.height);
+}
+
+function drawRain(now) {
+    if (!rain) return;
+    if (now >= rain.endsAt) {
+        stopTerminalMatrix();
+        return;
+    }
 
-        print(line);
+    const started = performance.now();
+    const { ctx, rect, columns, drops } = rain;
+    const row = rain.rows.shift();
 
-        if (Date.now() - startTime > duration) {
-            stopTerminalMatrix();
+    // Fade the previous frame to leave trails
+    ctx.fillStyle = "rgba(0, 0, 0, 0.08)";
+    ctx.fillRect(0, 0, rect.width, rect.height);
+    ctx.fillStyle = "#0f0";
+
+    for (let i = 0; i < columns; i++) {
+        const glyph = row
+            ? row[i % row.length]
+            : RAIN_GLYPHS[(Math.random() * RAIN_GLYPHS.length) | 0];
+        const y = drops[i] * RAIN_FONT_PX;
+
+        if (y > 0) ctx.fillText(glyph, i * RAIN_FONT_PX, y);
+
+        if (y > rect.height && Math.random() > 0.975) {
+            drops[i] = 0;
+        } else {
+            drops[i] += 1;
         }
-    }, 50);
+    }
+
+    // Adapt resolution to the measured cost of a frame
+    const cost = performance.now() - started;
+    rain.avgCost = rain.avgCost * 0.9 + cost * 0.1;
+    rain.sinceResize++;
+
+    let quality = rain.quality;
+    if (rain.avgCost > RAIN_FRAME_BUDGET_MS * 0.5) {
+        quality = Math.max(RAIN_MIN_QUALITY, rain.quality * 0.75);
+    } else if (rain.avgCost < RAIN_FRAME_BUDGET_MS * 0.15) {
+        quality = Math.min(1, rain.quality / 0.75);
+    }
+
+    if (quality !== rain.quality && rain.sinceResize >= RAIN_RESIZE_COOLDOWN_FRAMES) {
+        resizeRain(quality);
+        rain.avgCost = RAIN_FRAME_BUDGET_MS * 0.3;
+        rain.sinceResize = 0;
+    }
+
+    rain.frame = requestAnimationFrame(drawRain);
+}
+
+function stopRain() {
+    if (!rain) return;
+    cancelAnimationFrame(rain.frame);
+    if (rain.source) rain.source.close();
+    rain.canvas.remove();
+    rain = null;
 }
 
 function stopTerminalMatrix() {
-    clearInterval(matrixInterval);
-    matrixInterval = null;
+    stopRain();
 
     const art = [
 "           -@                                                               -***     ",
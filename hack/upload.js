@@ -1,6 +1,7 @@
 const folderInput = document.getElementById("folderInput");
 const projectNameEl = document.getElementById("projectName");
 const overwriteEl = document.getElementById("overwrite");
+const fingerprintEl = document.getElementById("fingerprint");
 const uploadBtn = document.getElementById("uploadBtn");
 const openBtn = document.getElementById("openBtn");
 const statusEl = document.getElementById("status");
@@ -11,6 +12,171 @@ function setStatus(msg) {
   statusEl.textContent = msg;
 }
 
+// ---- Tar packing ----
+// The folder goes up as one tar body instead of thousands of multipart
+// parts. The Blob only references the selected files, so nothing is read
+// until it is sent (or gzipped).
+
+const encoder = new TextEncoder();
+const TEXT_EXTS = /\.(html?|css|js|mjs|json|svg|txt|md|xml|map)$/i;
+
+function octal(n, width) {
+  return n.toString(8).padStart(width - 1, "0") + "\0";
+}
+
+function tarHeader(name, size, mtime, type) {
+  const h = new Uint8Array(512);
+  const put = (str, offset, length) => h.set(encoder.encode(str).slice(0, length), offset);
+
+  put(name, 0, 100);
+  put("0000644\0", 100, 8);
+  put(octal(0, 8), 108, 8);
+  put(octal(0, 8), 116, 8);
+  put(octal(size, 12), 124, 12);
+  put(octal(mtime, 12), 136, 12);
+  put("        ", 148, 8);
+  put(type, 156, 1);
+  put("ustar\0", 257, 6);
+  put("00", 263, 2);
+
+  const sum = h.reduce((a, b) => a + b, 0);
+  put(sum.toString(8).padStart(6, "0") + "\0 ", 148, 8);
+  return h;
+}
+
+// Names over 100 bytes go in a PAX "path" record before the entry
+function paxPath(name) {
+  const body = ` path=${name}\n`;
+  const len = encoder.encode(body).length;
+  let total = len + String(len).length;
+  if (String(total).length !== String(len).length) total = len + String(total).length;
+  return encoder.encode(`${total}${body}`);
+}
+
+function padding(size) {
+  return new Uint8Array((512 - (size % 512)) % 512);
+}
+
+function packTar(entries) {
+  const parts = [];
+  for (const { name, file } of entries) {
+    const mtime = Math.floor(file.lastModified / 1000);
+    if (encoder.encode(name).length > 100) {
+      const pax = paxPath(name);
+      parts.push(tarHeader("PaxHeader", pax.length, mtime, "x"), pax, padding(pax.length));
+    }
+    parts.push(tarHeader(name, file.size, mtime, "0"), file, padding(file.size));
+  }
+  parts.push(new Uint8Array(1024));
+  return new Blob(parts, { type: "application/x-tar" });
+}
+
+async function packFolder(files) {
+  const prefix = rootFolder + "/";
+  const entries = files.map(f => {
+    const rel = f.webkitRelativePath || f.name;
+    return { name: rel.startsWith(prefix) ? rel.slice(prefix.length) : rel, file: f };
+  });
+  const tar = packTar(entries);
+
+  // Gzip only pays off when most of the bytes are text
+  const textBytes = files.filter(f => TEXT_EXTS.test(f.name)).reduce((n, f) => n + f.size, 0);
+  if (typeof CompressionStream === "undefined" || textBytes < tar.size / 2) {
+    return tar;
+  }
+  const gz = tar.stream().pipeThrough(new CompressionStream("gzip"));
+  return new Response(gz).blob();
+}
+
+// ---- Resumable upload ----
+// Archives bigger than one chunk go up through an upload session. Chunks
+// are retried with backoff, and the session id is kept in localStorage, so
+// after a dropped link or a reload only the missing chunks are sent.
+
+const CHUNK_SIZE = 8 * 1024 * 1024;
+const MAX_RETRIES = 8;
+
+function sleep(ms) {
+  return new Promise(resolve => setTimeout(resolve, ms));
+}
+
+// fetch, retrying network errors and 5xx responses with exponential backoff
+async function fetchRetry(url, options) {
+  let delay = 1000;
+  for (let attempt = 0; ; attempt++) {
+    try {
+      const res = await fetch(url, options);
+      if (res.status < 500 || attempt >= MAX_RETRIES) return res;
+    } catch (err) {
+      if (attempt >= MAX_RETRIES) throw err;
+    }
+    setStatus(`Connection problem, retrying in ${delay / 1000}s...`);
+    await sleep(delay);
+    delay = Math.min(delay * 2, 30000);
+  }
+}
+
+function sessionKey(projectName, files, archive) {
+  const newest = files.reduce((t, f) => Math.max(t, f.lastModified), 0);
+  return `matrix-upload:${projectName}:${files.length}:${archive.size}:${newest}`;
+}
+
+async function openSession(key, archive, params) {
+  const saved = localStorage.getItem(key);
+  if (saved) {
+    const res = await fetchRetry(`/upload/sessions/${saved}`);
+    if (res.ok) return res.json();
+    localStorage.removeItem(key);
+  }
+
+  const query = new URLSearchParams(params);
+  query.set("size", archive.size);
+  query.set("chunk_size", CHUNK_SIZE);
+
+  const res = await fetchRetry(`/upload/sessions?${query}`, { method: "POST" });
+  const data = await res.json();
+  if (!res.ok) throw new Error(data.detail || "Could not start upload");
+
+  localStorage.setItem(key, data.upload_id);
+  return data;
+}
+
+async function uploadResumable(archive, files, projectName, params) {
+  const key = sessionKey(projectName, files, archive);
+  const session = await openSession(key, archive, params);
+  const done = new Set(session.received);
+
+  for (let i = 0; i < session.chunks && !session.finalized; i++) {
+    if (done.has(i)) continue;
+
+    const start = i * session.chunk_size;
+    const res = await fetchRetry(`/upload/sessions/${session.upload_id}/chunks/${i}`, {
+      method: "PUT",
+      body: archive.slice(start, start + session.chunk_size)
+    });
+    if (!res.ok) {
+      const data = await res.json();
+      throw new Error(data.detail || "Chunk upload failed");
+    }
+
+    done.add(i);
+    setStatus(`Uploading... ${Math.floor(done.size / session.chunks * 100)}% (${done.size}/${session.chunks} chunks)`);
+  }
+
+  setStatus("Unpacking on the server...");
+  let res;
+  for (let attempt = 0; ; attempt++) {
+    res = await fetchRetry(`/upload/sessions/${session.upload_id}/finalize`, { method: "POST" });
+    // An earlier finalize (whose answer got lost) may still be unpacking
+    if (res.status !== 409 || attempt >= 60) break;
+    const data = await res.clone().json();
+    if (!/already being finalized/.test(data.detail || "")) break;
+    await sleep(2000);
+  }
+  if (res.status !== 409) localStorage.removeItem(key);
+  return res;
+}
+
 folderInput.addEventListener("change", () => {
   const files = Array.from(folderInput.files || []);
   if (!files.length) {
@@ -53,24 +219,24 @@ uploadBtn.addEventListener("click", async () => {
   }
 
   uploadBtn.disabled = true;
-  setStatus("Uploading...");
-
-  const fd = new FormData();
-  fd.append("project_name", projectName);
-  fd.append("root_folder", rootFolder);
-  fd.append("overwrite", overwrite ? "true" : "false");
+  setStatus("Packing...");
 
-  // Important: keep relative paths. Browsers will send filename from webkitRelativePath.
-  // Most servers receive that relative path in UploadFile.filename.
-  for (const f of files) {
-    fd.append("files", f, f.webkitRelativePath || f.name);
-  }
+  const params = new URLSearchParams({
+    project_name: projectName,
+    overwrite: overwrite ? "true" : "false",
+    fingerprint: fingerprintEl.checked ? "true" : "false"
+  });
 
   try {
-    const res = await fetch("/upload/project", {
-      method: "POST",
-      body: fd
-    });
+    const archive = await packFolder(files);
+    setStatus("Uploading...");
+
+    const res = archive.size > CHUNK_SIZE
+      ? await uploadResumable(archive, files, projectName, params)
+      : await fetch(`/upload/archive?${params}`, {
+          method: "POST",
+          body: archive
+        });
 
     const data = await res.json();
 
@@ -91,7 +257,7 @@ uploadBtn.addEventListener("click", async () => {
     openBtn.disabled = false;
     openBtn.onclick = () => window.open(`/web/${encodeURIComponent(projectName)}/`, "_blank");
   } catch (err) {
-    setStatus("ERROR: Upload failed (network/server).");
+    setStatus(`ERROR: Upload failed (${err.message || "network/server"}).\nClick upload again to resume.`);
     uploadBtn.disabled = false;
   }
 });
\ No newline at end of file
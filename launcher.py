@@ -1,9 +1,159 @@
 import subprocess
+import json
 import os
+import signal
+import sys
 import time
+import urllib.error
+import urllib.request
 import webbrowser
 import traceback
 
+READY_TIMEOUT = 30
+
+# How long uploads and editor saves get to finish when the server is asked
+# to stop, before the launcher kills it
+GRACEFUL_SHUTDOWN_SECONDS = 20
+
+# A server that stayed up this long before crashing restarts immediately;
+# one that keeps crashing waits longer each time, up to the cap
+STABLE_UPTIME_SECONDS = 60
+RESTART_BACKOFF_MAX = 30
+
+
+def worker_count(argv):
+    """
+    `--workers N` on the command line, else MATRIX_WORKERS, else one worker
+    per CPU.
+    """
+    if "--workers" in argv:
+        i = argv.index("--workers")
+        if i + 1 >= len(argv) or not argv[i + 1].isdigit():
+            raise SystemExit("--workers needs a number")
+        return max(1, int(argv[i + 1]))
+
+    env = os.environ.get("MATRIX_WORKERS", "")
+    if env.isdigit():
+        return max(1, int(env))
+
+    return os.cpu_count() or 1
+
+
+def wait_until_ready(url, process, timeout=READY_TIMEOUT):
+    """Poll the health endpoint with exponential backoff until it answers."""
+    delay = 0.02
+    deadline = time.monotonic() + timeout
+
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            return False  # server exited before it came up
+
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                if response.status == 200:
+                    return True
+        except (urllib.error.URLError, OSError):
+            pass
+
+        time.sleep(delay)
+        delay = min(delay * 2, 0.5)
+
+    return False
+
+
+def print_startup_report(log_path, url, top=15):
+    """Summarize a `python -X importtime` log plus the app's own timings."""
+    imports = []
+    with open(log_path, encoding="utf-8", errors="replace") as f:
+        for line in f:
+            if not line.startswith("import time:") or "|" not in line:
+                continue
+            _, self_us, cumulative_us, name = (part.strip() for part in line.replace("import time:", "|", 1).split("|"))
+            if cumulative_us.isdigit():
+                imports.append((int(cumulative_us), int(self_us), name))
+
+    print("\n=== STARTUP REPORT ===")
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for cumulative_us, self_us, name in sorted(imports, reverse=True)[:top]:
+        print(f"{cumulative_us / 1000:>14.1f} {self_us / 1000:>9.1f}  {name}")
+
+    try:
+        with urllib.request.urlopen(url, timeout=1) as response:
+            for phase, ms in json.load(response).items():
+                print(f"app {phase}: {ms} ms")
+    except (urllib.error.URLError, OSError, ValueError):
+        pass
+
+    print(f"Full log: {log_path}\n")
+
+
+def stop_server(server):
+    """Ask the server to drain in-flight requests, then kill it if it won't."""
+    if server.poll() is not None:
+        return
+
+    print("[SUPERVISOR] stopping server...")
+    if os.name == "nt":
+        # uvicorn treats Ctrl+Break like Ctrl+C: stop accepting, finish requests
+        server.send_signal(signal.CTRL_BREAK_EVENT)
+    else:
+        server.send_signal(signal.SIGTERM)
+
+    try:
+        server.wait(GRACEFUL_SHUTDOWN_SECONDS + 5)
+    except subprocess.TimeoutExpired:
+        print("[SUPERVISOR] server did not stop in time, killing it")
+        server.kill()
+        server.wait()
+
+
+def supervise(server, start_server):
+    """
+    Watch the server process until asked to stop: restart it with backoff
+    when it dies, and stop it gracefully on SIGINT/SIGTERM.
+    """
+    stopping = []
+
+    def request_stop(signum, frame):
+        stopping.append(signum)
+
+    for name in ("SIGINT", "SIGTERM", "SIGBREAK"):
+        if hasattr(signal, name):
+            signal.signal(getattr(signal, name), request_stop)
+
+    launched = time.monotonic()
+    started = launched
+    restarts = 0
+    backoff = 1
+
+    while not stopping:
+        code = server.poll()
+        if code is None:
+            time.sleep(0.5)
+            continue
+
+        uptime = time.monotonic() - started
+        print(f"[SUPERVISOR] server exited with code {code} after {uptime:.0f}s")
+
+        backoff = 1 if uptime >= STABLE_UPTIME_SECONDS else min(backoff * 2, RESTART_BACKOFF_MAX)
+        restarts += 1
+        print(f"[SUPERVISOR] restart #{restarts} in {backoff}s")
+
+        deadline = time.monotonic() + backoff
+        while not stopping and time.monotonic() < deadline:
+            time.sleep(0.1)
+        if stopping:
+            break
+
+        server = start_server()
+        started = time.monotonic()
+
+    stop_server(server)
+    print(f"[SUPERVISOR] stopped after {time.monotonic() - launched:.0f}s uptime, {restarts} restart(s)")
+
+
+server = None
+
 try:
     # PyInstaller runtime folder
     RUNTIME_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -12,37 +162,83 @@ try:
     HOST = "127.0.0.1"
     PORT = "8000"
 
+    # --startup-report: run the server under `-X importtime` and print where
+    # cold-start time goes once it is up
+    STARTUP_REPORT = "--startup-report" in sys.argv[1:]
+    IMPORTTIME_LOG = os.path.join(RUNTIME_DIR, "startup-importtime.log")
+
+    # Several worker processes share the port; uvicorn's supervisor
+    # replaces any worker that dies. The app keeps its project index, caches
+    # and job records consistent between them through the filesystem.
+    WORKERS = worker_count(sys.argv[1:])
+
     print("=== CONNECTING TO THE MATRIX ===")
     print("RUNTIME_DIR:", RUNTIME_DIR)
     print("PYTHON_EXE:", PYTHON_EXE)
     print("Exists:", os.path.exists(PYTHON_EXE))
+    print("WORKERS:", WORKERS)
+
+    def start_server(python_flags=(), stderr=None):
+        # The server gets its own process group so a console Ctrl+C reaches
+        # only the launcher, which then asks it to drain exactly once
+        if os.name == "nt":
+            group = {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+        else:
+            group = {"start_new_session": True}
 
-    server = subprocess.Popen(
-        [
-            PYTHON_EXE,
-            "-m",
-            "uvicorn",
-            "app:app",
-            "--app-dir",
-            RUNTIME_DIR,
-            "--host",
-            HOST,
-            "--port",
-            PORT,
-        ],
-        cwd=RUNTIME_DIR
-    )
-
-    time.sleep(1)
+        return subprocess.Popen(
+            [
+                PYTHON_EXE,
+                *python_flags,
+                "-m",
+                "uvicorn",
+                "app:app",
+                "--app-dir",
+                RUNTIME_DIR,
+                "--host",
+                HOST,
+                "--port",
+                PORT,
+                "--workers",
+                str(WORKERS),
+                "--timeout-graceful-shutdown",
+                str(GRACEFUL_SHUTDOWN_SECONDS),
+            ],
+            cwd=RUNTIME_DIR,
+            env={**os.environ, "MATRIX_WORKERS": str(WORKERS)},
+            stderr=stderr,
+            **group
+        )
+
+    python_flags = ["-X", "importtime"] if STARTUP_REPORT else []
+    stderr = open(IMPORTTIME_LOG, "w") if STARTUP_REPORT else None
+
+    started = time.perf_counter()
+    server = start_server(python_flags, stderr)
+
+    if not wait_until_ready(f"http://{HOST}:{PORT}/healthz", server):
+        raise RuntimeError(f"Server did not become ready within {READY_TIMEOUT}s")
+
+    print(f"Server ready in {(time.perf_counter() - started) * 1000:.0f} ms")
+    if STARTUP_REPORT:
+        stderr.flush()
+        print_startup_report(IMPORTTIME_LOG, f"http://{HOST}:{PORT}/healthz/startup")
     webbrowser.open(f"http://{HOST}:{PORT}")
 
     print(f"Server running at http://{HOST}:{PORT}")
-    print("Close this window to stop the server.")
+    print("Press Ctrl+C to stop the server.")
+
+    supervise(server, start_server)
 
-    while True:
-        time.sleep(1)
+except KeyboardInterrupt:
+    # Ctrl+C before the supervisor took over the signals
+    if server is not None:
+        stop_server(server)
 
 except Exception:
     print("\n=== LAUNCHER CRASHED ===")
     traceback.print_exc()
+    # The server runs in its own session, so it would outlive us otherwise
+    if server is not None:
+        stop_server(server)
     input("\nPress Enter to close...")
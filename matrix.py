@@ -1,10 +1,18 @@
-import random
 import string
+import shutil
 import time
 import sys
 import os
 
-os.system("")  # enable ANSI colors on Windows
+_ansi_enabled = False
+
+
+def enable_ansi():
+    """Turn on ANSI colors in the Windows console (done on first use, not import)."""
+    global _ansi_enabled
+    if not _ansi_enabled:
+        os.system("")
+        _ansi_enabled = True
 
 GREEN = "\033[92m"
 BRIGHT = "\033[1m"
@@ -76,23 +84,42 @@ ASCII_ART = r"""
         ACCESS GRANTED
 """
 
-def matrix_burst(lines=35, width=80):
-    chars = string.ascii_letters + string.digits
+RAIN_CHARS = string.ascii_letters + string.digits
+
+# 256-entry lookup table: every random byte maps straight to a glyph, so a
+# whole block of rain is one os.urandom() + one bytes.translate() call.
+# (256 isn't a multiple of 62, so the first few glyphs are very slightly
+# more common; nobody watching the rain can tell.)
+_RAIN_TABLE = (RAIN_CHARS * (256 // len(RAIN_CHARS) + 1))[:256].encode("ascii")
+
+
+def rain_rows(rows, width):
+    """Return `rows` random lines of `width` glyphs, generated in one block."""
+    block = os.urandom(rows * width).translate(_RAIN_TABLE).decode("ascii")
+    return [block[i:i + width] for i in range(0, len(block), width)]
+
+
+def matrix_burst(lines=35, width=None, rows_per_frame=1, frame_delay=0.03):
+    # Default to the full console width, however wide it is
+    enable_ansi()
+    width = width or shutil.get_terminal_size((80, 24)).columns
+    out = sys.stdout
 
-    # --- Matrix rain ---
-    for _ in range(lines):
-        line = "".join(random.choice(chars) for _ in range(width))
-        print(GREEN + line + RESET)
-        sys.stdout.flush()
-        time.sleep(0.03)
+    # --- Matrix rain (one buffered write per frame) ---
+    rows = rain_rows(lines, width)
+    for i in range(0, lines, rows_per_frame):
+        out.write(GREEN + "\n".join(rows[i:i + rows_per_frame]) + RESET + "\n")
+        out.flush()
+        time.sleep(frame_delay * rows_per_frame)
 
     # --- Dramatic pause ---
     time.sleep(0.2)
 
     # --- Clear a bit of space ---
-    print("\n" * 2)
+    out.write("\n" * 3)
 
     # --- ASCII finale ---
     for line in ASCII_ART.splitlines():
-        print(GREEN + BRIGHT + line + RESET)
+        out.write(GREEN + BRIGHT + line + RESET + "\n")
+        out.flush()
         time.sleep(0.05)
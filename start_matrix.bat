@@ -2,8 +2,9 @@
 cd /d %~dp0
 
 set PORT=8000
+if "%MATRIX_WORKERS%"=="" set MATRIX_WORKERS=%NUMBER_OF_PROCESSORS%
 
-echo === CONNECTING TO THE MATRIX ON PORT %PORT% ===
+echo === CONNECTING TO THE MATRIX ON PORT %PORT% (%MATRIX_WORKERS% workers) ===
 echo.
 
 REM --- Kill any process already using the port ---
@@ -18,7 +19,7 @@ echo Starting server...
 echo.
 
 REM --- Start server (BLOCKING) ---
-python\python.exe -m uvicorn app:app --host 127.0.0.1 --port %PORT%
+python\python.exe -m uvicorn app:app --host 127.0.0.1 --port %PORT% --workers %MATRIX_WORKERS%
 
 REM --- If we ever get here, server exited ---
 echo.
@@ -0,0 +1,31 @@
+// === Matrix Starter Script ===
+
+const canvas = document.getElementById("rain");
+const ctx = canvas.getContext("2d");
+const glyphs = "01アイウエオカキクケコサシスセソ";
+const size = 16;
+let drops = [];
+
+function resize() {
+    canvas.width = window.innerWidth;
+    canvas.height = window.innerHeight;
+    drops = Array(Math.ceil(canvas.width / size)).fill(0);
+}
+
+function draw() {
+    ctx.fillStyle = "rgba(0, 0, 0, 0.08)";
+    ctx.fillRect(0, 0, canvas.width, canvas.height);
+    ctx.fillStyle = "#00ff66";
+    ctx.font = `${size}px monospace`;
+
+    drops.forEach((y, i) => {
+        ctx.fillText(glyphs[Math.floor(Math.random() * glyphs.length)], i * size, y * size);
+        drops[i] = y * size > canvas.height && Math.random() > 0.975 ? 0 : y + 1;
+    });
+
+    requestAnimationFrame(draw);
+}
+
+window.addEventListener("resize", resize);
+resize();
+draw();
@@ -0,0 +1,7 @@
+// === Modern Starter Script ===
+
+console.log("Site loaded");
+
+document.getElementById("actionBtn").addEventListener("click", () => {
+    alert("Hello from the Matrix 👾");
+});